@@ -1 +1,4 @@
-from .main import *
\ No newline at end of file
+"""
+    The simulation modules (physics, energy, scene, run, sweep...) don't need wx, so importing the package doesn't load the GUI.
+    The GUI is started with pendulumscripts.main.main()
+"""
@@ -0,0 +1,136 @@
+import numpy
+import updatable
+
+class GraphableData():
+    def __init__(self, values=[], colour=None, visible=True):
+        self.__values = values
+        self.__colour = colour
+        self.__visible = visible
+        self.__iterator = 0
+
+    @property
+    def values(self):
+        return self.__values
+
+    @values.setter
+    def values(self, values):
+        self.__values = values
+
+    @property
+    def colour(self):
+        return self.__colour
+
+    @colour.setter
+    def colour(self, colour):
+        self.__colour = colour
+
+    @property
+    def visible(self):
+        return self.__visible
+
+    @visible.setter
+    def visible(self, visible):
+        self.__visible = visible
+
+    @property
+    def active(self):
+        return self.__active
+
+    @active.setter
+    def active(self, active):
+        self.__active = active
+
+    @property
+    def iterator(self):
+        return self.__iterator
+
+    @iterator.setter
+    def iterator(self, iterator):
+        self.__iterator = iterator
+
+class EnergyExtensionBase(updatable.Updatable):
+    """Computes the energies of a pendulum and keeps their history. It doesn't need wx"""
+    def __init__(self, pendulum, ticksPerUpdate=1):
+        updatable.Updatable.__init__(self, ticksPerUpdate)
+
+        self.pendulum = pendulum
+        self.UpdateVariables()
+
+        self.data = {"total":GraphableData(values=[0]), 
+                    "kinetic":GraphableData(values=[0]), 
+                    "potential":GraphableData(values=[0])
+                    }
+    
+    def UpdateVariables(self):
+        """The variable objects of the pendulum change when bobs are inserted or removed, so they are read again"""
+        objects = self.pendulum.GetVariableObjects()
+        self.angles = objects['angles']
+        self.velocities = objects['velocities']
+        self.masses = objects['masses']
+        self.lengths = objects['lengths']
+        self.g = objects['g']
+
+    def GetPotentialEnergy(self):
+        self.UpdateVariables()
+        if len(self.masses) == 0:
+            return 0
+        # Suppose the pivot has coordinates (0, 0)
+        geometry = self.pendulum.GetGeometry()
+        heights = numpy.cumsum(self.lengths) - geometry.y
+        return float(numpy.dot(self.masses, heights) * self.g)
+
+    def GetKineticEnergy(self):
+        self.UpdateVariables()
+        if len(self.masses) == 0:
+            return 0
+        geometry = self.pendulum.GetGeometry()
+        lv = self.lengths * self.velocities
+        vx = numpy.cumsum(lv * geometry.cos)
+        vy = numpy.cumsum(lv * geometry.sin)
+        return float(numpy.dot(self.masses, vx * vx + vy * vy) / 2)
+
+    # Overload from Updatable class
+    def UpdateData(self):
+        potential = self.GetPotentialEnergy()
+        kinetic = self.GetKineticEnergy()
+        total = potential + kinetic
+        self.AddValue('potential', potential)
+        self.AddValue('kinetic', kinetic)
+        self.AddValue('total', total)
+
+    def AddValue(self, key, value):
+        self.data[key].values.append(value)
+
+    def SetColours(self, total=None, kinetic=None, potential=None):
+        if total != None:
+            self.data['total'].colour = total
+        if kinetic != None:
+            self.data['kinetic'].colour = kinetic
+        if potential != None:
+            self.data['potential'].colour = potential
+
+if __name__ == '__main__':
+    from physics import PendulumBase
+
+    pend = PendulumBase(1, 1, 0.0001)
+    pend.AddBob(1, angle=3, mass=1, length=100)
+    pend.AddBob(2, angle=3.1415, mass=1, length=100)
+    pend.AddBob(3, length=100, angle=3.1415, mass=1)
+    ee = EnergyExtensionBase(pend)
+    variables = pend.GetVariableObjects()
+
+    mini = ee.GetPotentialEnergy() + ee.GetKineticEnergy()
+    maxi = mini
+    
+    print "Init total: " + str(mini)
+
+    for i in range(0, 30000):
+        pend.Tick()
+        total = ee.GetPotentialEnergy() + ee.GetKineticEnergy()
+        mini = min(mini, total)
+        maxi = max(maxi, total)
+
+    print "Current total: " + str(ee.GetPotentialEnergy() + ee.GetKineticEnergy())
+    print "Min: " + str(mini)
+    print "Max: " + str(maxi)
+    print variables
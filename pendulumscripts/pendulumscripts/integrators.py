@@ -0,0 +1,184 @@
+from __future__ import division
+import numpy
+
+class Integrator(object):
+    """Advances the state of a PendulumBase over a time interval.
+        The accelerations are obtained from pendulum.Derivatives(), so every call is counted by the pendulum
+    """
+    name = None
+
+    def Step(self, pendulum, deltaT):
+        """This function is implemented by subclasses"""
+        raise NotImplementedError
+
+    def Reset(self):
+        """Forgets any state kept between steps (e.g. the adaptive step size)"""
+        pass
+
+class SemiImplicitEuler(Integrator):
+    """First order, one evaluation per step. This is the original integration scheme"""
+    name = 'euler'
+
+    def Step(self, pendulum, deltaT):
+        if pendulum.bobCount == 0:
+            return
+        acc = pendulum.Accelerations()
+        vels = pendulum.vels
+        vels += acc * deltaT
+        pendulum.angles += vels * deltaT
+
+class Verlet(Integrator):
+    """Second order velocity Verlet (kick-drift-kick), two evaluations per step.
+        It is symplectic and time reversible for forces that depend only on the angles,
+        so the energy oscillates around its value instead of drifting
+    """
+    name = 'verlet'
+
+    def Step(self, pendulum, deltaT):
+        if pendulum.bobCount == 0:
+            return
+        angles, vels = pendulum.GetState()
+        vels, acc = pendulum.Derivatives(angles, vels)
+        vels = vels + acc * (deltaT / 2)
+        angles = angles + vels * deltaT
+        vels, acc = pendulum.Derivatives(angles, vels)
+        vels = vels + acc * (deltaT / 2)
+        pendulum.SetState(angles, vels)
+
+class RK4(Integrator):
+    """Classic fourth order Runge-Kutta, four evaluations per step"""
+    name = 'rk4'
+
+    def Step(self, pendulum, deltaT):
+        if pendulum.bobCount == 0:
+            return
+        angles, vels = pendulum.GetState()
+        h = deltaT
+
+        da1, dv1 = pendulum.Derivatives(angles, vels)
+        da2, dv2 = pendulum.Derivatives(angles + da1 * h / 2, vels + dv1 * h / 2)
+        da3, dv3 = pendulum.Derivatives(angles + da2 * h / 2, vels + dv2 * h / 2)
+        da4, dv4 = pendulum.Derivatives(angles + da3 * h, vels + dv3 * h)
+
+        angles = angles + (da1 + 2 * da2 + 2 * da3 + da4) * h / 6
+        vels = vels + (dv1 + 2 * dv2 + 2 * dv3 + dv4) * h / 6
+        pendulum.SetState(angles, vels)
+
+class RK45(Integrator):
+    """Adaptive Dormand-Prince 5(4) with error control.
+        Step() covers deltaT with as many sub-steps as the tolerance requires;
+        the step size is kept between calls, so a smooth motion needs few evaluations.
+        The last stage of a call is reused as the first stage of the next one while the pendulum wasn't changed in between,
+        so a sub-step costs 6 evaluations. A sub-step never crosses the end of deltaT, so the pendulum's time interval
+        must be longer than the step the tolerance allows for RK45 to save work, e.g. SetIntegrator('rk45', timeInterval=1/60.)
+    """
+    name = 'rk45'
+
+    # Dormand-Prince coefficients
+    C = [0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1]
+    A = [
+        [],
+        [1 / 5],
+        [3 / 40, 9 / 40],
+        [44 / 45, -56 / 15, 32 / 9],
+        [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+        [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+        [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84]]
+    # Difference between the fifth and the fourth order weights
+    E = [71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40]
+
+    def __init__(self, relativeTolerance=1e-6, absoluteTolerance=1e-6, maxStep=None):
+        self.relativeTolerance = relativeTolerance
+        self.absoluteTolerance = absoluteTolerance
+        self.maxStep = maxStep
+        self.h = None
+        self.rejected = 0
+        # The derivatives at the end of the last call, and what they depend on
+        self.last = None
+        self.lastKey = None
+
+    def Reset(self):
+        self.h = None
+        self.last = None
+        self.lastKey = None
+
+    def GetKey(self, pendulum):
+        """The state the saved derivatives belong to; the version changes with every change of the angles or of the bobs"""
+        return (id(pendulum), pendulum.version, pendulum.bobCount, pendulum.frictionCoefficient, pendulum.g)
+
+    def Step(self, pendulum, deltaT):
+        n = pendulum.bobCount
+        if n == 0:
+            return
+        angles, vels = pendulum.GetState()
+        y = numpy.concatenate((angles, vels))
+
+        def f(y):
+            da, dv = pendulum.Derivatives(y[:n], y[n:])
+            return numpy.concatenate((da, dv))
+
+        h = self.h
+        if h == None:
+            h = deltaT
+
+        k = [None] * 7
+        if self.lastKey == self.GetKey(pendulum):
+            # First Same As Last across the calls
+            k[0] = self.last
+        else:
+            k[0] = f(y)
+        t = 0
+        while deltaT - t > 1e-12 * deltaT:
+            if self.maxStep != None:
+                h = min(h, self.maxStep)
+            # The last sub-step is cut so it ends exactly at deltaT
+            step = min(h, deltaT - t)
+
+            for i in range(1, 7):
+                dy = numpy.zeros_like(y)
+                for j in range(0, i):
+                    if self.A[i][j] != 0:
+                        dy += self.A[i][j] * k[j]
+                k[i] = f(y + step * dy)
+            # The seventh stage is evaluated at the fifth order solution
+            yNew = y + step * dy
+
+            error = numpy.zeros_like(y)
+            for i in range(0, 7):
+                if self.E[i] != 0:
+                    error += self.E[i] * k[i]
+            error *= step
+            tolerance = self.absoluteTolerance + self.relativeTolerance * numpy.maximum(numpy.abs(y), numpy.abs(yNew))
+            norm = numpy.sqrt(numpy.mean((error / tolerance) ** 2))
+
+            if norm == 0:
+                factor = 5.
+            else:
+                factor = min(5., max(0.2, 0.9 * norm ** -0.2))
+
+            if norm <= 1:
+                y = yNew
+                t += step
+                # First Same As Last - the last stage is the first stage of the next sub-step
+                k[0] = k[6]
+                # A sub-step that was cut to the end of the interval doesn't shrink the step size
+                h = max(h, step * factor) if step < h else step * factor
+            else:
+                self.rejected += 1
+                h = step * min(1., factor)
+
+        self.h = h
+        pendulum.SetState(y[:n], y[n:])
+        self.last = k[0]
+        self.lastKey = self.GetKey(pendulum)
+
+INTEGRATORS = {
+    SemiImplicitEuler.name: SemiImplicitEuler,
+    Verlet.name: Verlet,
+    RK4.name: RK4,
+    RK45.name: RK45}
+
+def CreateIntegrator(name, **kwargs):
+    """Creates an integrator from its name: 'euler', 'verlet', 'rk4' or 'rk45'"""
+    assert(name in INTEGRATORS), "Unknown integrator: " + str(name)
+    return INTEGRATORS[name](**kwargs)
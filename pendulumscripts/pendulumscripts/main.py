@@ -5,6 +5,8 @@ from __future__ import division
 import os
 import time
 import threading
+import multiprocessing
+import numpy
 import wx
 import wx.lib.agw.pycollapsiblepane as wxcp
 import wx.lib.newevent
@@ -12,8 +14,13 @@ import wx.lib.scrolledpanel as wxsp
 import explorer
 import widgets
 import extensions
+import scheduler
+import physicsprocess
+import renderer
+import raster
+from scene import SceneToDict
 from pendulum import Pendulum, CollisionState
-from math import sqrt, atan2
+from math import sqrt, atan2, ceil
 
 class BufferedWindow(wx.Window):
     """A class used for drawing a BufferdWindow
@@ -45,12 +52,13 @@ class BufferedWindow(wx.Window):
         if e != None:
             e.Skip()
 
+    # The buffer is already drawn by UpdateDrawing(), so painting only copies it on the screen
     def OnPaint(self, e=None):
-        self.Draw(wx.BufferedPaintDC(self, self._Buffer))
+        wx.BufferedPaintDC(self, self._Buffer)
 
     # Does the same thing as OnPaint but is called by the client, not from a PaintEvent handler
     def Paint(self):
-        self.Draw(wx.BufferedDC(wx.ClientDC(self), self._Buffer))
+        wx.BufferedDC(wx.ClientDC(self), self._Buffer)
 
 class SimulationWindowMouseHandler():
     """A dummy class for separating functions visually"""
@@ -85,7 +93,8 @@ class SimulationWindowMouseHandler():
         self.lastMouseY = y
 
         if not e.LeftIsDown() and not e.RightIsDown():
-            self.hoverState = self.pendulumHandler.PendulumCollision(*self.TranslateCoord(x, y))
+            if not self.skipping:
+                self.hoverState = self.pendulumHandler.PendulumCollision(*self.TranslateCoord(x, y))
             return
 
         if self.state & (self.MOVING_STATE | self.MOVING_FROM_RIGHT_CLICK_STATE):
@@ -185,6 +194,8 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
     MOVING_FROM_RIGHT_CLICK_STATE = 64
 
     TICKS_PER_SECOND = 500
+    # The frame rate used when the refresh rate of the display isn't known
+    DEFAULT_REFRESH_RATE = 60
 
     def __init__(self, *args, **kwargs):
         kwargs['name'] = 'simulationWindow'
@@ -205,6 +216,7 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
         # The same is for the pendulum EnergyExtension - it has to update every second
         # If you change the ticksPerSecond here, you have to change it in the AddPendulum() function
         self.energyDisplay = widgets.EnergyDisplay(self, self.TICKS_PER_SECOND, size=(0, 200), style=wx.BORDER_SIMPLE)
+        self.pendulumHandler.GetUpdateScheduler().Add(self.energyDisplay.screen)
 
         frictionGliderSizer = wx.BoxSizer(wx.HORIZONTAL)
         # Add a very high proportion compared to the frictionGlider so it will aligned to the right
@@ -239,6 +251,28 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
         self.dragState = CollisionState()
         self.hoverState = CollisionState()
         self.pause = True
+        # True while AdvanceTo() runs; the drawing and the hit-testing are suspended
+        self.skipping = False
+        # The child process that runs the physics instead of the simulation thread, see SetPhysicsProcess()
+        self.physicsProcess = None
+
+        # Frame pacing: a frame is drawn only if it's dirty, at most once per refresh of the display
+        self.dirty = True
+        self.viewState = None
+        # The frames keep being drawn until this time, so the interpolated motion can settle after a pause
+        self.settleTime = 0
+        self.frameInterval = 1. / self.DEFAULT_REFRESH_RATE
+        self.framesToSkip = 0
+        # The raster.Framebuffer the grid and the pendulums are drawn into, see SetRasterBackend(); None draws on the DC
+        self.framebuffer = None
+        # The frame statistics since the last call to GetFrameStats()
+        self.frames = 0
+        self.skippedFrames = 0
+        self.drawTime = 0
+        self.statsStart = scheduler.clock()
+
+        # Calls Tick() TICKS_PER_SECOND times per second from the simulation thread, sleeping in between
+        self.scheduler = scheduler.FixedStepScheduler(self.TICKS_PER_SECOND, self.Tick, paused=self.pause)
 
         self.gridSpace = 100
         self.grid = Grid(self, space=self.gridSpace, minScaleLim=0.2, maxScaleLim=6, colourCode=(200, 200, 200))
@@ -255,7 +289,8 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
         print "SimulationWindow initiated"
 
     def StartThread(self):
-        self.timer.Start(1000. / 200)
+        self.frameInterval = 1. / self.GetRefreshRate()
+        self.timer.Start(int(round(self.frameInterval * 1000)))
 
         self.running = True
         self.main_thread = threading.Thread(target=self.run)
@@ -264,43 +299,153 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
 
     def StopThread(self):
         self.timer.Stop()
+        self.SetRasterBackend(False)
+        if self.physicsProcess != None:
+            self.physicsProcess.Stop()
 
         if self.running:
             self.running = False
+            self.scheduler.Stop()
             self.main_thread.join()
 
     def run(self):
         """This is the function that runs the main thread.
             It calls the Tick() function every 'self.TICKS_PER_SECOND' seconds
-            This is the heart of the simulation. It is latency-safe, meaning if the Tick() function lags sometimes
-            If you don't want for this to be latency-safe, you can change the second while statement to an if statement"""
+            This is the heart of the simulation. It is latency-safe, meaning if the Tick() function lags sometimes,
+            the ticks that are due are run in a batch. Between ticks, and while paused, the thread sleeps"""
         print "Thread started"
 
-        lastTime = time.clock()
-        ticksPerSecond = self.TICKS_PER_SECOND
-        tickInterval = 1. / ticksPerSecond
-
-        while self.running:
-            currentTime = time.clock()
-
-            while currentTime - lastTime >= tickInterval:
-                if self.pause != True:
-                    self.Tick()
-                lastTime += tickInterval
+        self.scheduler.Run()
 
     def Tick(self):
+        # The edits made from the GUI are applied here, between two ticks, so they never race with the physics
+        self.pendulumHandler.ApplyCommands()
+        # The energy display is updated by the scheduler of the PendulumHandler, together with the pendulums
         self.pendulumHandler.Tick()
-        self.energyDisplay.Tick()
+        self.pendulumHandler.Publish()
 
     def OnTimer(self, e):
+        if self.skipping:
+            return
+
+        if self.physicsProcess != None and not self.pause:
+            self.pendulumHandler.ReadFrame()
+            self.dirty = True
+        elif self.pause:
+            # The simulation thread doesn't run while paused, but the pendulums can still be edited
+            with self.scheduler.lock:
+                self.pendulumHandler.ApplyCommands()
+                if self.pendulumHandler.Publish():
+                    self.dirty = True
+        else:
+            # The simulation thread publishes new states all the time
+            self.dirty = True
+
+        viewState = self.GetViewState()
+        if viewState != self.viewState or scheduler.clock() < self.settleTime:
+            self.viewState = viewState
+            self.dirty = True
+
+        if not self.dirty:
+            return
+        if self.framesToSkip > 0:
+            self.framesToSkip -= 1
+            self.skippedFrames += 1
+            return
+
+        start = scheduler.clock()
         self.UpdateDrawing()
+        drawTime = scheduler.clock() - start
+        self.dirty = False
+        self.frames += 1
+        self.drawTime += drawTime
+        # If drawing took longer than a frame, the next frames are skipped so the interface stays responsive
+        self.framesToSkip = int(drawTime / self.frameInterval)
+
+    def GetViewState(self):
+        """Everything besides the pendulums that is drawn; the frame is drawn again when it changes"""
+        hover = self.hoverState
+        return (self.originX, self.originY, self.scale, self.state, self.lastMouseX, self.lastMouseY,
+                hover.id, hover.pivot, hover.bobIndex, hover.rod, tuple(self.GetClientSize()),
+                self.pendulumHandler.GetChangeCount())
+
+    def SetDirty(self):
+        """Makes the next timer event draw a frame"""
+        self.dirty = True
+
+    def GetRefreshRate(self):
+        index = wx.Display.GetFromWindow(self)
+        refreshRate = wx.Display(max(index, 0)).GetCurrentMode().refresh
+        if refreshRate <= 0:
+            refreshRate = self.DEFAULT_REFRESH_RATE
+        return refreshRate
+
+    def GetFrameStats(self):
+        """Returns the frames per second, the average time to draw a frame (in seconds)
+            and the skipped frames since the last call"""
+        currentTime = scheduler.clock()
+        elapsed = currentTime - self.statsStart
+        fps = 0
+        frameTime = 0
+        if elapsed > 0:
+            fps = self.frames / elapsed
+        if self.frames > 0:
+            frameTime = self.drawTime / self.frames
+        stats = (fps, frameTime, self.skippedFrames)
+
+        self.frames = 0
+        self.skippedFrames = 0
+        self.drawTime = 0
+        self.statsStart = currentTime
+        return stats
 
-    def Draw(self, dc):
-        dc.Clear()
+    def UpdateDrawing(self):
+        if self.framebuffer != None:
+            self.Rasterise()
+        BufferedWindow.UpdateDrawing(self)
+
+    def Rasterise(self):
+        """Draws the grid and the pendulums into the framebuffer and copies it into the buffer of the window"""
+        width, height = self._Buffer.GetSize()
+        if (width, height) != (self.framebuffer.width, self.framebuffer.height):
+            self.framebuffer.Resize(width, height)
+
+        rows, columns = self.grid.GetLines()
+        self.framebuffer.AddRows(numpy.array(rows) + self.originY, self.grid.colourCode)
+        self.framebuffer.AddColumns(numpy.array(columns) + self.originX, self.grid.colourCode)
+        self.framebuffer.AddRows([self.originY], (0, 0, 0))
+        self.framebuffer.AddColumns([self.originX], (0, 0, 0))
+        self.pendulumHandler.Rasterise(self.framebuffer, self.originX, self.originY, self.scale)
+        self.framebuffer.Render()
+
+        self._Buffer.CopyFromBuffer(self.framebuffer.pixels, wx.BitmapBufferFormat_RGB)
+
+    def SetRasterBackend(self, enabled, threads=None):
+        """Draws the grid and the pendulums with the NumPy rasteriser instead of the DC calls.
+            The framebuffer is split in 'threads' tiles rendered in parallel, one per processor by default"""
+        if not enabled:
+            if self.framebuffer != None:
+                self.framebuffer.Close()
+                self.framebuffer = None
+        else:
+            if threads == None:
+                threads = multiprocessing.cpu_count()
+            if self.framebuffer == None:
+                width, height = self._Buffer.GetSize()
+                self.framebuffer = raster.Framebuffer(width, height)
+            self.framebuffer.SetThreads(threads)
+        self.SetDirty()
 
+    def IsRasterBackend(self):
+        return self.framebuffer != None
+
+    def Draw(self, dc):
         dc.SetDeviceOrigin(self.originX, self.originY)
 
-        self.grid.Draw(dc)
+        # The raster backend has already drawn the grid and the pendulums into the buffer
+        if self.framebuffer == None:
+            dc.Clear()
+            self.grid.Draw(dc)
 
         #Drawing the origin
         dc.DrawCircle(0, 0, 3)
@@ -315,24 +460,84 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
             dc.SetBrush(wx.Brush(wx.Colour(175, 175, 175)))
             dc.DrawCircle(self.TranslateCoord(self.lastMouseX, self.lastMouseY), 10)
 
-        self.pendulumHandler.Draw(dc)
+        if self.framebuffer == None:
+            self.pendulumHandler.Draw(dc, self.GetViewport(), self.scale)
         if self.state & self.CREATION_STATE:
             self.pendulumCreator.Draw(dc)
 
+    def GetViewport(self):
+        """The (left, top, right, bottom) of the world that is visible in the window"""
+        width, height = self.GetClientSize()
+        left, top = self.TranslateCoord(0, 0)
+        right, bottom = self.TranslateCoord(width, height)
+        return left, top, right, bottom
+
     def TranslateCoord(self, x, y):
         return (x - self.originX) / self.scale, (y- self.originY) / self.scale
 
     def SetPause(self, pause):
         self.pause = pause
+        self.settleTime = scheduler.clock() + 0.1
         if pause == False:
             self.state |= self.STARTED_STATE
+        if self.physicsProcess != None:
+            # The child process steps copies of the pendulums, the local ones stay paused
+            with self.scheduler.lock:
+                self.pendulumHandler.SetRemotePaused(pause)
+            return
+        self.scheduler.SetPaused(pause)
         self.pendulumHandler.Pause(pause)
 
+    def SetPhysicsProcess(self, enabled):
+        """Runs the physics in a child process (see physicsprocess.py), so it doesn't share the GIL with the interface.
+            The energy graph isn't updated while the child process runs the pendulums"""
+        pause = self.pause
+        self.SetPause(True)
+        if enabled and self.physicsProcess == None:
+            self.physicsProcess = physicsprocess.PhysicsProcess(self.TICKS_PER_SECOND)
+        elif not enabled and self.physicsProcess != None:
+            self.physicsProcess.Stop()
+            self.physicsProcess = None
+        self.pendulumHandler.SetRemote(self.physicsProcess)
+        self.SetPause(pause)
+
+    def IsPhysicsProcess(self):
+        return self.physicsProcess != None
+
+    def AdvanceTo(self, targetTime, progress=None):
+        """Advances all the pendulums to the simulated time targetTime as fast as possible (see PendulumHandler.AdvanceTo()).
+            The simulation thread, the drawing, the energy graph and the hover hit-testing are suspended during the jump.
+            Returns False if it was cancelled
+        """
+        pause = self.pause
+        self.SetPause(True)
+        self.state |= self.STARTED_STATE
+        self.skipping = True
+        try:
+            with self.scheduler.lock:
+                self.pendulumHandler.ApplyCommands()
+                completed = self.pendulumHandler.AdvanceTo(targetTime, progress)
+                self.pendulumHandler.Publish()
+        finally:
+            self.skipping = False
+            self.SetPause(pause)
+        self.UpdateDrawing()
+        return completed
+
+    def GetTime(self):
+        return self.pendulumHandler.GetTime()
+
     def Reload(self):
         self.SetPause(True)
         self.state &= ~self.STARTED_STATE
         self.pendulumHandler.ReleaseStack()
         self.pendulumHandler.SendParameters()
+        self.pendulumHandler.ResetTime()
+        # Nothing ticks while paused, so the reload is applied now and GetTime() starts again from 0
+        with self.scheduler.lock:
+            self.pendulumHandler.ApplyCommands()
+            self.pendulumHandler.Publish()
+        self.SetDirty()
 
     def OnSize(self, e=None):
         self.grid.SetSpace(self.gridSpace * self.scale)
@@ -387,6 +592,21 @@ class SimulationWindow(BufferedWindow, SimulationWindowMouseHandler):
     def IsPaused(self):
         return self.pause
 
+    def SetTimeScale(self, timeScale):
+        """Sets the real time factor: 2 runs the simulation twice as fast as the clock, 0.5 in slow motion"""
+        self.pendulumHandler.SetTimeScale(timeScale)
+
+    def GetTimeScale(self):
+        return self.pendulumHandler.GetTimeScale()
+
+    def GetCpuUsage(self):
+        """The fraction of the time the simulation thread was busy since the last call"""
+        return self.scheduler.GetCpuUsage()
+
+    def GetOverloadTime(self):
+        """The time the pendulums fell behind the clock (slow motion or dropped) since the last call"""
+        return self.pendulumHandler.GetOverloadTime()
+
     def IsStarted(self):
         return self.state & self.STARTED_STATE
 
@@ -411,6 +631,10 @@ class Grid():
         self.scale = 1
         self.mouseScale = 1
 
+        # The lines are drawn once into a bitmap that is blitted at every frame, see GetBitmap()
+        self.bitmap = None
+        self.bitmapKey = None
+
     def SetX(self, x):
         self.x = x
 
@@ -454,28 +678,59 @@ class Grid():
 
         e.Skip()
 
+    def GetLines(self):
+        """Returns the y of the horizontal lines and the x of the vertical lines inside the rectangle"""
+        rows = []
+        l1 = self.y - self.y % self.space
+        while l1 <= self.y + self.height:
+            rows.append(l1)
+            l1 += self.space
+
+        columns = []
+        c1 = self.x - self.x % self.space
+        while c1 <= self.x + self.width:
+            columns.append(c1)
+            c1 += self.space
+
+        return rows, columns
+
+    def GetBitmap(self):
+        """A bitmap with the lines at every multiple of the space, one space bigger than the rectangle.
+            Moving the grid only changes where it's blitted, so it's redrawn only when the space (the zoom) or the size change"""
+        key = (self.space, self.width, self.height, self.colourCode)
+        if key == self.bitmapKey:
+            return self.bitmap
+
+        width = int(ceil(self.width + self.space)) + 1
+        height = int(ceil(self.height + self.space)) + 1
+        self.bitmap = wx.Bitmap(width, height)
+        dc = wx.MemoryDC(self.bitmap)
+        dc.SetBackground(wx.Brush(self.parentWindow.GetBackgroundColour()))
+        dc.Clear()
+
+        lines = []
+        for i in range(0, int(height / self.space) + 1):
+            l1 = int(round(i * self.space))
+            lines.append((0, l1, width, l1))
+        for i in range(0, int(width / self.space) + 1):
+            c1 = int(round(i * self.space))
+            lines.append((c1, 0, c1, height))
+        dc.DrawLineList(lines, wx.Pen(wx.Colour(self.colourCode)))
+        del dc
+
+        self.bitmapKey = key
+        return self.bitmap
+
     def Draw(self, dc):
         """Draws a set of parallel, horizontal and vertical lines, inside a rectangle determined by the x, y, w, h variables
             (x,y) is the upper-left corner of the rectangle and w, h are it dimensions"""
-        dc.SetPen(wx.Pen(wx.Colour(self.colourCode)))
-        dc.SetBrush(wx.Brush(wx.Colour(self.colourCode)))
-
         w = self.width
         h = self.height
         x = self.x
         y = self.y
 
-        #Draws the horizontal lines
-        l1 = y - y % self.space
-        while l1 <= y + h:
-            dc.DrawLine(x, l1, x + w, l1)
-            l1 += self.space
-
-        #Draws the vertical lines
-        c1 = x - x % self.space
-        while c1 <= x + w:
-            dc.DrawLine(c1, y, c1, y + h)
-            c1 += self.space
+        # The first line of the bitmap goes on the first multiple of the space in the rectangle
+        dc.DrawBitmap(self.GetBitmap(), int(round(x - x % self.space)), int(round(y - y % self.space)))
 
         #Draws the Ox and Oy lines
         dc.SetPen(wx.Pen(wx.Colour(wx.BLACK)))
@@ -590,8 +845,28 @@ class PendulumHandler(wx.EvtHandler):
         self.pendulumId = 0
         self.bobId = 0
         self.timeInterval = 1000
+        self.timeScale = 1
         self.pause = False
 
+        # Updates the active pendulums and the extension of the selected pendulum
+        self.updateScheduler = scheduler.UpdateScheduler()
+        self.selectedExtension = None
+
+        # The changes to the active pendulums are posted here and applied by the simulation thread between ticks
+        self.commands = scheduler.CommandQueue()
+        # The pivot of every pendulum, with the moves that are still in the command queue
+        self.pivotDict = {}
+
+        # The PhysicsProcess that steps copies of the pendulums, and the ids of the pendulums in the order they were sent
+        self.remote = None
+        self.remoteIds = None
+
+        # Counts the changes of the pendulums that are drawn but aren't part of their state (selection, adding, removing)
+        self.changeCount = 0
+
+        # Draws all the pendulums with one DC call for every style
+        self.renderer = renderer.PendulumRenderer()
+
         self.pendulumEventHandler = None
         self.simulationWindow = wx.FindWindowByName('simulationWindow')
 
@@ -609,7 +884,12 @@ class PendulumHandler(wx.EvtHandler):
         bobId = self.AddBob(pendulumId=e.pendulumId, valueDict=e.values)
     
     def OnFrictionUpdate(self, e):
-        Pendulum.frictionCoefficient = e.value
+        self.commands.Post(self.SetFriction, (e.value,), key='friction')
+        if self.remoteIds != None:
+            self.remote.SetFriction(e.value)
+
+    def SetFriction(self, frictionCoefficient):
+        Pendulum.frictionCoefficient = frictionCoefficient
 
     def CompleteValueDict(self, valueDict):
         for variable, value in self.defaultVariableList.iteritems():
@@ -621,14 +901,18 @@ class PendulumHandler(wx.EvtHandler):
             timeInterval = self.timeInterval
         self.pendulumId += 1
         pendulum = Pendulum(x, y, timeInterval)
+        pendulum.timeScale = self.timeScale
         ee = extensions.EnergyExtension(pendulum, extensionTicksPerUpdate)
         self.extensionDict[self.pendulumId] = ee
         if not self.simulationWindow.IsStarted():
             self.pendulumDict[self.pendulumId] = pendulum
+            self.updateScheduler.Add(pendulum)
             self.simulationWindow.SetExtension(ee)
         else:
             self.futurePendulumDict[self.pendulumId] = pendulum
         self.variableList[self.pendulumId] = dict()
+        self.pivotDict[self.pendulumId] = (x, y)
+        self.changeCount += 1
 
         #Send the event to the Explorer
         pendulumEvent = explorer.PendulumCreationReadyEvent(pendulumId=self.pendulumId)
@@ -669,7 +953,7 @@ class PendulumHandler(wx.EvtHandler):
         return self.bobId
 
     def CreateBob(self, pendulumId, bobId):
-        self.pendulumDict[pendulumId].AddBob(bobId)
+        self.commands.Post(self.pendulumDict[pendulumId].AddBob, (bobId,))
 
     def RemoveBob(self, pendulumId, bobId):
         print "pendulumId: " + str(pendulumId)
@@ -678,7 +962,7 @@ class PendulumHandler(wx.EvtHandler):
             if pendulumId in self.futureBobDict and bobId in self.futureBobDict[pendulumId]:
                 self.futureBobDict[pendulumId].remove(bobId)
             else:
-                self.pendulumDict[pendulumId].RemoveBob(bobId)
+                self.commands.Post(self.pendulumDict[pendulumId].RemoveBob, (bobId,))
         else:
             self.futurePendulumDict[pendulumId].RemoveBob(bobId)
             
@@ -686,6 +970,10 @@ class PendulumHandler(wx.EvtHandler):
 
     def RemovePendulum(self, pendulumId):
         if self.pendulumDict.get(pendulumId) != None:
+            self.updateScheduler.Remove(self.pendulumDict[pendulumId])
+            if self.selectedExtension is self.extensionDict[pendulumId]:
+                self.updateScheduler.Remove(self.selectedExtension)
+                self.selectedExtension = None
             del self.pendulumDict[pendulumId] # Check this
             if pendulumId in self.futureBobDict:
                 del self.futureBobDict[pendulumId]
@@ -693,6 +981,8 @@ class PendulumHandler(wx.EvtHandler):
             del self.futurePendulumDict[pendulumId]
 
         del self.variableList[pendulumId]
+        del self.pivotDict[pendulumId]
+        self.changeCount += 1
 
     def CreateDataDict(self, dct):
         new_dict = dict()
@@ -710,6 +1000,52 @@ class PendulumHandler(wx.EvtHandler):
             return
         self.pendulumDict[pendulumId].updateInterval = timeInterval
         self.pendulumDict[pendulumId].timeInterval = timeInterval
+        self.updateScheduler.Reschedule(self.pendulumDict[pendulumId])
+
+    def SetTimeScale(self, timeScale):
+        """Runs all the pendulums timeScale times faster than real time. The energy extensions
+            are updated by ticks, so they still take one sample per tick, not one per physics step
+        """
+        self.timeScale = timeScale
+        for pendulum in self.futurePendulumDict.values():
+            pendulum.timeScale = timeScale
+        for pendulum in self.pendulumDict.values():
+            pendulum.timeScale = timeScale
+            self.updateScheduler.Reschedule(pendulum)
+        if self.remote != None:
+            self.remote.SetTimeScale(timeScale)
+
+    def GetTimeScale(self):
+        return self.timeScale
+
+    def AdvanceTo(self, targetTime, progress=None, chunkSteps=1000):
+        """Steps every pendulum until its simulated time reaches targetTime, without waiting for the clock.
+            progress(done, total) is called after every chunk of steps; if it returns False the jump is cancelled
+            and the pendulums stay where they got. Returns True if all the pendulums reached targetTime
+        """
+        remaining = {}
+        for pendulum in self.pendulumDict.values():
+            steps = int(ceil((targetTime - pendulum.time) / pendulum.deltaT - 1e-9))
+            if steps > 0:
+                remaining[pendulum] = steps
+
+        total = sum(remaining.values())
+        done = 0
+        while remaining:
+            for pendulum in remaining.keys():
+                steps = min(chunkSteps, remaining[pendulum])
+                pendulum.UpdateSteps(steps)
+                done += steps
+                remaining[pendulum] -= steps
+                if remaining[pendulum] == 0:
+                    del remaining[pendulum]
+            if progress != None and progress(done, total) == False:
+                return False
+        return True
+
+    def GetTime(self):
+        """The simulated time of the pendulum that is the furthest ahead"""
+        return max([pendulum.time for pendulum in self.pendulumDict.values()] + [0])
 
     def LinkVariable(self, obj, pendulumId, bobId, name):
         self.bobLinker[obj] = self.variableList[pendulumId][bobId][name]
@@ -747,17 +1083,78 @@ class PendulumHandler(wx.EvtHandler):
     def SendParameters(self):
         for pendulumId, pendulum in self.pendulumDict.items():
             for bobId, parameters in self.variableList[pendulumId].items():
-                pendulum.SetBob(
-                    bobId,
+                values = (bobId,
                     parameters['m'].val,
                     parameters['l'].val,
                     parameters['a'].val,
                     parameters['v'].val)
+                self.commands.Post(pendulum.SetBob, values, key=('bob', pendulumId, bobId))
+
+    def ResetTime(self):
+        """Sets the simulated time of every pendulum back to 0, with its evaluation count and the state of its integrator"""
+        for pendulumId, pendulum in self.pendulumDict.items():
+            self.commands.Post(self.ResetPendulum, (pendulum,), key=('reset', pendulumId))
+
+    def ResetPendulum(self, pendulum):
+        pendulum.ResetEvaluationCount()
+        pendulum.GetIntegrator().Reset()
+
+    def SetRemote(self, remote):
+        """Sets the PhysicsProcess that runs the active pendulums while the simulation isn't paused, or None"""
+        self.remote = remote
+        if remote != None:
+            remote.SetTimeScale(self.timeScale)
+
+    def SetRemotePaused(self, pause):
+        """Starts the remote process with the current state of the active pendulums, or stops it and takes its state back.
+            It must be called while the simulation thread doesn't tick"""
+        if not pause and self.remoteIds == None:
+            self.ApplyCommands()
+            remoteIds = sorted(self.pendulumDict.keys())
+            pendulums = [self.pendulumDict[pendulumId] for pendulumId in remoteIds]
+            scene = SceneToDict(pendulums, friction=Pendulum.frictionCoefficient)
+            for description, pendulum in zip(scene['pendulums'], pendulums):
+                description['time'] = pendulum.time
+            self.remote.LoadScene(scene)
+            # The pendulums are remote only once the scene is loaded
+            self.remoteIds = remoteIds
+            self.remote.SetPaused(False)
+        elif pause and self.remoteIds != None:
+            self.remote.SetPaused(True)
+            states = self.remote.GetState()
+            for pendulumId, (x, y, simulatedTime, angles, vels) in zip(self.remoteIds, states):
+                pendulum = self.pendulumDict.get(pendulumId)
+                if pendulum == None:
+                    continue
+                pendulum.SetPivot(x, y)
+                pendulum.SetState(angles, vels)
+                pendulum.time = simulatedTime
+                pendulum.SetExternalSnapshot(None)
+                self.pivotDict[pendulumId] = (x, y)
+            self.remoteIds = None
+            self.Publish()
+
+    def ReadFrame(self):
+        """Makes the active pendulums draw the latest frame published by the remote process.
+            The frame is a copy, so it can be drawn and hit-tested until the next one is read"""
+        frame = self.remote.GetFrame()
+        if frame == None or frame.count != len(self.remoteIds):
+            return
+        for index, pendulumId in enumerate(self.remoteIds):
+            pendulum = self.pendulumDict.get(pendulumId)
+            if pendulum != None:
+                pendulum.SetExternalSnapshot(physicsprocess.FrameSnapshot(frame, index, pendulum))
+
+    def ApplyCommands(self):
+        """Applies the changes posted to the command queue. It's called by the thread that updates the pendulums"""
+        self.commands.Apply()
 
     def ReleaseStack(self):
         for pendulumId, pendulum in self.futurePendulumDict.items():
             self.pendulumDict[pendulumId] = pendulum
+            self.updateScheduler.Add(pendulum)
         self.futurePendulumDict = {}
+        self.changeCount += 1
         for pendulumId, bobList in self.futureBobDict.items():
             for bobId in bobList:
                 self.CreateBob(pendulumId, bobId)
@@ -776,15 +1173,28 @@ class PendulumHandler(wx.EvtHandler):
         return CollisionState()
 
     def MovePendulum(self, pendulumId, dx, dy):
-        pend = self.pendulumDict[pendulumId]
-        pend.SetX(pend.GetX() + dx)
-        pend.SetY(pend.GetY() + dy)
+        x, y = self.pivotDict[pendulumId]
+        x += dx
+        y += dy
+        self.pivotDict[pendulumId] = (x, y)
+        # Only the last position is applied if the pendulum is moved several times between two ticks
+        self.commands.Post(self.pendulumDict[pendulumId].SetPivot, (x, y), key=('pivot', pendulumId))
+        if self.remoteIds != None and pendulumId in self.remoteIds:
+            self.remote.SetPivot(self.remoteIds.index(pendulumId), x, y)
 
     def SelectPendulum(self, pendulumId, selected=True):
         for pendulum in self.pendulumDict.values():
             pendulum.SetSelected(False)
         self.pendulumDict[pendulumId].SetSelected(selected)
+        self.changeCount += 1
+
+        # Only the extension of the selected pendulum is updated
+        if self.selectedExtension != None:
+            self.updateScheduler.Remove(self.selectedExtension)
+            self.selectedExtension = None
         if selected == True:
+            self.selectedExtension = self.extensionDict[pendulumId]
+            self.updateScheduler.Add(self.selectedExtension)
             self.simulationWindow.SetExtension(self.extensionDict[pendulumId])
 
     def IsSelected(self, pendulumId):
@@ -800,21 +1210,45 @@ class PendulumHandler(wx.EvtHandler):
             pendulum.pause = pause
 
     def Tick(self):
+        self.updateScheduler.Tick()
+
+    def GetUpdateScheduler(self):
+        return self.updateScheduler
+
+    def Publish(self):
+        """Publishes the state of the pendulums for the drawing and the hit-testing (see PendulumBase.Publish()).
+            Returns True if any of them changed"""
+        changed = False
         for pendulum in self.pendulumDict.values():
-            pendulum.Tick()
-        for extension in self.extensionDict.values():
-            if extension.pendulum.IsSelected():
-                extension.Tick()
+            if pendulum.Publish():
+                changed = True
+        return changed
 
-    def Draw(self, dc):
+    def GetChangeCount(self):
+        return self.changeCount
+
+    def GetOverloadTime(self):
+        overloadTime = 0
         for pendulum in self.pendulumDict.values():
-            pendulum.Draw(dc)
+            overloadTime += pendulum.droppedTime + pendulum.dilatedTime
+            pendulum.ResetOverload()
+        return overloadTime
+
+    def Draw(self, dc, viewport=None, scale=1):
+        """Draws the pendulums inside the viewport (see SimulationWindow.GetViewport()), with less detail at small scales"""
+        self.renderer.Draw(dc, self.pendulumDict.values(), viewport, scale)
+
+    def Rasterise(self, framebuffer, originX, originY, scale):
+        self.renderer.Rasterise(framebuffer, self.pendulumDict.values(), originX, originY, scale)
 
     def SetPendulumEventHandler(self, pendulumEventHandler):
         self.pendulumEventHandler = pendulumEventHandler
 
 class MainFrame(wx.Frame):
     """Derive a new class from Frame"""
+    # The real time factors that can be chosen from the toolbar
+    TIME_SCALES = [0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100]
+
     def __init__(self, parent, title):
         width = 800
         height = 600
@@ -831,6 +1265,17 @@ class MainFrame(wx.Frame):
         self.pauseTool = toolbar.AddRadioTool(wx.ID_ANY, 'Pause', wx.Bitmap('icons/pause.png'))
         toolbar.ToggleTool(self.pauseTool.GetId(), True)
         self.reloadTool = toolbar.AddTool(wx.ID_ANY, 'Reload', wx.Bitmap('icons/reload.png'))
+        self.advanceTool = toolbar.AddTool(wx.ID_ANY, 'Advance to...', wx.Bitmap('icons/last.png'), shortHelp='Advance to a simulated time')
+        toolbar.AddSeparator()
+        self.timeScaleChoice = wx.Choice(toolbar, choices=[str(timeScale) + 'x' for timeScale in self.TIME_SCALES])
+        self.timeScaleChoice.SetSelection(self.TIME_SCALES.index(1))
+        self.timeScaleChoice.SetToolTip('Simulation speed')
+        toolbar.AddControl(self.timeScaleChoice)
+        self.physicsProcessCheckBox = wx.CheckBox(toolbar, label='Physics in a separate process')
+        toolbar.AddControl(self.physicsProcessCheckBox)
+        self.rasterCheckBox = wx.CheckBox(toolbar, label='Software renderer')
+        self.rasterCheckBox.SetToolTip('Draw the scene with NumPy instead of the DC, for very large scenes')
+        toolbar.AddControl(self.rasterCheckBox)
         toolbar.Realize()
 
         # Set events
@@ -839,13 +1284,44 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_TOOL, self.OnTogglePlay, self.playTool)
         self.Bind(wx.EVT_TOOL, self.OnTogglePlay, self.pauseTool)
         self.Bind(wx.EVT_TOOL, self.OnReload, self.reloadTool)
+        self.Bind(wx.EVT_TOOL, self.OnAdvance, self.advanceTool)
+        self.Bind(wx.EVT_CHOICE, self.OnTimeScale, self.timeScaleChoice)
+        self.Bind(wx.EVT_CHECKBOX, self.OnPhysicsProcess, self.physicsProcessCheckBox)
+        self.Bind(wx.EVT_CHECKBOX, self.OnRaster, self.rasterCheckBox)
         self.Bind(wx.EVT_CLOSE, self.OnClose)
 
         self.simulationWindow = SimulationWindow(self, size=(width, 0))
 
+        # The status bar shows how busy the simulation thread is and the frame rate, refreshed every second
+        self.CreateStatusBar()
+        self.statusTimer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.OnStatusTimer, self.statusTimer)
+        self.statusTimer.Start(1000)
+
         self.Centre()
         self.Show(True)
 
+    def OnStatusTimer(self, e):
+        text = "Simulation CPU: %d%%" % (self.simulationWindow.GetCpuUsage() * 100)
+        fps, frameTime, skippedFrames = self.simulationWindow.GetFrameStats()
+        text += "   FPS: %.0f (%.1f ms/frame" % (fps, frameTime * 1000)
+        if skippedFrames > 0:
+            text += ", %d skipped" % skippedFrames
+        text += ")"
+        overloadTime = self.simulationWindow.GetOverloadTime()
+        if overloadTime > 0:
+            text += "   Overloaded: %.2fs behind" % overloadTime
+        self.SetStatusText(text)
+
+    def OnTimeScale(self, e):
+        self.simulationWindow.SetTimeScale(self.TIME_SCALES[self.timeScaleChoice.GetSelection()])
+
+    def OnPhysicsProcess(self, e):
+        self.simulationWindow.SetPhysicsProcess(self.physicsProcessCheckBox.GetValue())
+
+    def OnRaster(self, e):
+        self.simulationWindow.SetRasterBackend(self.rasterCheckBox.GetValue())
+
     def OnChangeCursor(self, e):
         id = e.GetId()
         if id == self.selectionTool.GetId():
@@ -864,9 +1340,27 @@ class MainFrame(wx.Frame):
         self.GetToolBar().ToggleTool(self.pauseTool.GetId(), True)
         self.simulationWindow.Reload()
 
+    def OnAdvance(self, e):
+        defaultTime = "%g" % (self.simulationWindow.GetTime() + 600)
+        with wx.TextEntryDialog(self, "Simulated time to advance to (seconds):", caption="Advance to", value=defaultTime) as dialog:
+            if dialog.ShowModal() != wx.ID_OK:
+                return
+            try:
+                targetTime = float(dialog.GetValue())
+            except ValueError:
+                wx.MessageBox("'%s' is not a number" % dialog.GetValue(), "Advance to", wx.OK | wx.ICON_ERROR, self)
+                return
+
+        style = wx.PD_APP_MODAL | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME
+        with wx.ProgressDialog("Advance to", "Advancing to %gs of simulated time" % targetTime, maximum=1000, parent=self, style=style) as dialog:
+            def Progress(done, total):
+                return dialog.Update(int(1000 * done / total))[0]
+            self.simulationWindow.AdvanceTo(targetTime, Progress)
+
     def OnClose(self, e):
         with wx.MessageDialog(self, "Are you sure you want to quit?", caption="Quit?", style=wx.YES_NO|wx.CANCEL|wx.CANCEL_DEFAULT|wx.ICON_QUESTION) as dialog:
             if dialog.ShowModal() == wx.ID_YES:
+                self.statusTimer.Stop()
                 self.simulationWindow.Close(True)
                 e.Skip()
 
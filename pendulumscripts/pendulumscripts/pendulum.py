@@ -1,190 +1,14 @@
 from __future__ import division
-import numpy
-from numpy.linalg import solve
-from numpy import zeros, float64
-from math import sin, cos, sqrt
+from math import sqrt
 import wx
 import time
-from updatable import Updatable
-
-numpy.seterr(all='raise')
-
-class PendulumBase(Updatable):
-
-    frictionCoefficient = 0
-
-    def __init__(self, x, y, timeInterval):
-        Updatable.__init__(self, updateInterval=timeInterval)
-
-        self.x = x
-        self.y = y
-
-        self.bobCount = 0
-
-        self.g = 9.8
-        self.angles = [0]
-        self.vels = []
-        self.m = []
-        self.l = []
-        self.deltaT = timeInterval
-        self.scale = 100
-
-        self.A = None
-        self.B = None
-        self.lc = None
-        self.ls = None
-        self.lcv = None
-        self.lsv = None
-
-        self.idList = []
-
-    def InitArrays(self):
-        n = self.bobCount
-        self.A = zeros((2 * n , 2 * n), dtype=float64)
-        self.B = zeros(2 * n, dtype=float64)
-        self.lc = zeros(n, dtype=float64)
-        self.ls = zeros(n, dtype=float64)
-        self.lcv = zeros(n, dtype=float64)
-        self.lsv = zeros(n, dtype=float64)
-
-    def InsertBob(self, bobId, pos=-1, mass=10, length=100, angle=0, velocity=0):
-        #Here I should raise an exception if the bobId is already used
-        
-        if pos == -1:
-            pos = self.bobCount
-        
-        self.bobCount += 1
-        self.idList.insert(pos, bobId)
-
-        self.m.insert(pos, mass)
-        self.l.insert(pos, length / self.scale)
-        self.vels.insert(pos, velocity)
-        self.angles.insert(pos, angle)
-
-        self.InitArrays()
-
-    def AddBob(self, bobId, mass=10, length=100, angle=0, velocity=0):
-        self.InsertBob(bobId, self.bobCount, mass, length, angle, velocity)
-
-    def RemoveBob(self, bobId):
-        self.bobCount -= 1
-        index = self.idList.index(bobId)
-        self.idList.pop(index)
-
-        self.m.pop(index)
-        self.l.pop(index)
-        self.vels.pop(index)
-        self.angles.pop(index)
-
-        self.InitArrays()
-
-    def SetBob(self, bobId, mass=None, length=None, angle=None, velocity=None):
-        index = self.idList.index(bobId)
-        if mass != None:
-            self.m[index] = mass
-        if length != None:
-            self.l[index] = length / self.scale
-        if angle != None:
-            self.angles[index] = angle
-        if velocity != None:
-            self.vels[index] = velocity
-
-    def Accelerations(self):
-        if self.bobCount == 0:
-            return
-
-        n = self.bobCount
-        a = self.angles
-
-        #Check boundaries
-        for i in range(0, n):
-            if self.vels[i] < -100:
-                self.vels[i] = 100
-            if self.vels[i] > 100:
-                self.vels[i] = 100
-
-        for i in range(0, n):
-            self.lc[i] = self.l[i] * cos(a[i])
-            self.ls[i] = self.l[i] * sin(a[i])
-            self.lcv[i] = self.lc[i] * self.vels[i] * self.vels[i]
-            self.lsv[i] = self.ls[i] * self.vels[i] * self.vels[i]
-        for i in range(0, n):
-            for j in range(0, i + 1):
-                self.A[2 * i][j] = - self.lc[j]
-                self.A[2 * i + 1][j] = - self.ls[j]
-
-            frictionX = abs(self.vels[i]) * self.frictionCoefficient * cos(a[i])
-            frictionY = abs(self.vels[i]) * self.frictionCoefficient * sin(a[i])
-
-            if self.vels[i] < 0:
-                frictionX *= -1
-                frictionY *= -1
-
-            self.B[2 * i] = - self.lsv[i] + frictionX
-            self.B[2 * i + 1] = self.lcv[i] + frictionY
-
-            if i > 0:
-                self.B[2 * i] += self.B[2 * i - 2]
-                self.B[2 * i + 1] += self.B[2 * i - 1]
-            else:
-                self.B[2 * i + 1] += self.g
-            self.A[2 * i][n + i] = - sin(a[i]) / self.m[i]
-            self.A[2 * i + 1][n + i] = cos(a[i]) / self.m[i]
-            if i == n - 1:
-                continue
-            self.A[2 * i][n + i + 1] = sin(a[i + 1]) / self.m[i]
-            self.A[2 * i + 1][n + i + 1] = - cos(a[i + 1]) / self.m[i]
-
-        assert(not numpy.isnan(self.A).any() and not numpy.isnan(self.B).any()), "There are NaN values in the arrays - pendulum.py Accelerations()"
-
-
-        acc = solve(self.A, self.B)
-        return acc[:n]
-
-    def UpdateData(self):
-        acc = self.Accelerations()
-        for i in range(0, self.bobCount):
-            self.vels[i] += acc[i] * self.deltaT
-            self.angles[i] += self.vels[i] * self.deltaT
-
-    def GetX(self):
-        return self.x
-
-    def SetX(self, x):
-        self.x = x
-
-    def GetY(self):
-        return self.y
-
-    def SetY(self, y):
-        self.y = y
-
-    def GetVariableObjects(self):
-        return {
-            "angles": self.angles, 
-            "velocities": self.vels,
-            "masses": self.m,
-            "lengths": self.l,
-            "g": self.g}
-    
-    @property
-    def timeInterval(self):
-        return self.deltaT
-    
-    @timeInterval.setter
-    def timeInterval(self, timeInterval):
-        self.deltaT = timeInterval
-
-class CollisionState():
-    def __init__(self, pivot=False, bobIndex=0, lastBob=False, rod=False, id=0):
-        self.pivot = pivot
-        self.bobIndex = bobIndex
-        self.lastBob = lastBob
-        self.rod = rod
-        self.id = id
+from physics import ChainGeometry, PendulumBase, PendulumEnsemble, CollisionState, SnapshotInterpolator
+from scheduler import clock
 
 class Pendulum(PendulumBase):
     radius = 13
+    # If True, Draw() interpolates between the two latest physics states instead of drawing the latest one
+    interpolate = True
 
     def __init__(self, x, y, timeInterval):
         PendulumBase.__init__(self, x, y, timeInterval)
@@ -192,43 +16,52 @@ class Pendulum(PendulumBase):
         self.selected = False
         self.hovered = False
 
+        self.interpolator = SnapshotInterpolator()
+
     def GetPivot(self):
         return self.x, self.y
 
+    def SetPivot(self, x, y):
+        self.x = x
+        self.y = y
+
     def GetPos(self, bobId=None):
-        index = self.bobCount
+        snapshot = self.GetSnapshot()
+        index = snapshot.bobCount
         if bobId != None:
-            index = self.idList.index(bobId)
-        x = self.x
-        y = self.y
-        for i in range(index):
-            x += sin(self.angles[i]) * self.l[i] * self.scale
-            y += cos(self.angles[i]) * self.l[i] * self.scale
-        return (x, y)
+            index = snapshot.idList.index(bobId)
+        if index == 0:
+            return (snapshot.x, snapshot.y)
+        geometry = snapshot.GetGeometry()
+        x = snapshot.x + geometry.x[index - 1] * snapshot.scale
+        y = snapshot.y + geometry.y[index - 1] * snapshot.scale
+        return (float(x), float(y))
 
     def PendulumCollision(self, mx, my):
         """Check if the cursor at the coordinates (mx, my) is over the pendulum
                 (over any bob or its rods)
         """
+        snapshot = self.GetSnapshot()
 
-        x = self.x
-        y = self.y
+        x = snapshot.x
+        y = snapshot.y
 
         # Check collision for the pivot
         if self.BobCollision(mx, my, x, y, self.radius):
-            if self.bobCount == 0:
+            if snapshot.bobCount == 0:
                 return CollisionState(pivot=True, lastBob=True)
             return CollisionState(pivot=True)
 
-        for i in range(0, self.bobCount):
-            nx = x + sin(self.angles[i]) * self.l[i] * self.scale
-            ny = y + cos(self.angles[i]) * self.l[i] * self.scale
+        xs, ys = snapshot.GetGeometry().GetPoints(x, y, snapshot.scale)
+        for i in range(0, snapshot.bobCount):
+            nx = xs[i + 1]
+            ny = ys[i + 1]
 
             if self.BobCollision(mx, my, nx, ny, self.radius):
                 # If it is the last bob
-                if i == self.bobCount - 1:
-                    return CollisionState(bobIndex=self.idList[i], lastBob=True)
-                return CollisionState(bobIndex=self.idList[i])
+                if i == snapshot.bobCount - 1:
+                    return CollisionState(bobIndex=snapshot.idList[i], lastBob=True)
+                return CollisionState(bobIndex=snapshot.idList[i])
 
             if self.RodCollision(mx, my, x, y, nx, ny, 5):
                 return CollisionState(rod=True)
@@ -278,11 +111,24 @@ class Pendulum(PendulumBase):
 
         return p
 
+    def GetBoundingCircle(self):
+        """The (x, y, radius) of a circle that holds the pendulum in any position, halo included"""
+        snapshot = self.GetSnapshot()
+        return snapshot.x, snapshot.y, snapshot.l.sum() * snapshot.scale + self.radius + 4
+
+    def GetDrawSnapshot(self):
+        """The state to draw now. The physics thread may be stepping the pendulum, so only the published snapshots are drawn"""
+        snapshot = self.GetSnapshot()
+        if self.interpolate:
+            snapshot = self.interpolator.Get(snapshot, clock())
+        return snapshot
+
     def Draw(self, dc, tx=0, ty=0):
-        x = self.x
-        y = self.y
+        snapshot = self.GetDrawSnapshot()
+        x = snapshot.x
+        y = snapshot.y
 
-        if self.bobCount == 0:
+        if snapshot.bobCount == 0:
             if self.selected:
                 dc.SetBrush(wx.Brush(wx.Colour(186, 170, 221)))
                 dc.SetPen(wx.Pen(wx.Colour(186, 170, 221)))
@@ -292,8 +138,11 @@ class Pendulum(PendulumBase):
             dc.DrawCircle(x, y, self.radius - 3)
             return
 
-        nx = x + sin(self.angles[0]) * self.l[0] * self.scale
-        ny = y + cos(self.angles[0]) * self.l[0] * self.scale
+        # xs[0], ys[0] is the pivot and xs[i + 1], ys[i + 1] is the bob i
+        xs, ys = snapshot.GetGeometry().GetPoints(x, y, snapshot.scale)
+
+        nx = xs[1]
+        ny = ys[1]
         if self.selected:
             dc.SetBrush(wx.Brush(wx.Colour(186, 170, 221)))
             dc.SetPen(wx.Pen(wx.Colour(186, 170, 221)))
@@ -312,7 +161,9 @@ class Pendulum(PendulumBase):
             return
         dc.DrawCircle(x, y, self.radius - 3)
 
-        for i in range(1, self.bobCount):
+        for i in range(1, snapshot.bobCount):
+            nx = xs[i]
+            ny = ys[i]
 
             if self.selected:
                 dc.SetBrush(wx.Brush(wx.Colour(186, 170, 221)))
@@ -322,8 +173,8 @@ class Pendulum(PendulumBase):
                 points = self.GetRect(
                     nx + tx,
                     ny + ty,
-                    nx + sin(self.angles[i]) * self.l[i] * self.scale + tx,
-                    ny + cos(self.angles[i]) * self.l[i] * self.scale + ty,
+                    xs[i + 1] + tx,
+                    ys[i + 1] + ty,
                     3)
                 dc.DrawPolygon(points)
 
@@ -332,17 +183,15 @@ class Pendulum(PendulumBase):
             dc.DrawLine(
                 nx + tx,
                 ny + ty,
-                nx + sin(self.angles[i]) * self.l[i] * self.scale + tx,
-                ny + cos(self.angles[i]) * self.l[i] * self.scale + ty)
+                xs[i + 1] + tx,
+                ys[i + 1] + ty)
 
             dc.SetBrush(wx.Brush(wx.Colour(68, 68, 68)))
             dc.SetPen(wx.Pen(wx.Colour(68, 68, 68)))
             dc.DrawCircle(nx, ny, self.radius)
-            x = nx
-            y = ny
-            nx += sin(self.angles[i]) * self.l[i] * self.scale
-            ny += cos(self.angles[i]) * self.l[i] * self.scale
 
+        nx = xs[-1]
+        ny = ys[-1]
         if self.selected:
             dc.SetBrush(wx.Brush(wx.Colour(186, 170, 221)))
             dc.SetPen(wx.Pen(wx.Colour(186, 170, 221)))
@@ -374,6 +223,7 @@ if __name__ == '__main__':
         p.UpdateData()
     t = time.clock() - t
     print 'Time: ' + str(t)
+    print 'Evaluations per simulated second: ' + str(p.GetEvaluationsPerSecond())
     f = open('pendulum_performance_time.txt', 'a')
     f.write('n=' + str(p.bobCount) + '\n')
     f.write('ticks=' + str(ticks) + '\n')
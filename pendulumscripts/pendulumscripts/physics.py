@@ -0,0 +1,982 @@
+"""
+    The physics of the n-link pendulums. This module needs only numpy,
+    so it can be used without wx (the drawing is in pendulum.py)
+"""
+from __future__ import division
+import copy
+import numpy
+from numpy.linalg import solve
+from numpy import zeros, float64
+from math import sin, cos
+from updatable import Updatable
+from scheduler import clock
+import integrators
+
+numpy.seterr(all='raise')
+
+class ChainGeometry(object):
+    """The geometry derived from the state of a pendulum: sin and cos of every angle
+        and the positions of the bobs relative to the pivot, in meters (multiply them by the scale for pixels)
+    """
+    def __init__(self, angles, lengths, version):
+        self.version = version
+        self.sin = numpy.sin(angles)
+        self.cos = numpy.cos(angles)
+        self.x = numpy.cumsum(lengths * self.sin)
+        self.y = numpy.cumsum(lengths * self.cos)
+
+    def GetPoints(self, pivotX, pivotY, scale):
+        """Returns the lists of x and y coordinates of the pivot followed by all the bobs"""
+        xs = [pivotX]
+        xs.extend((self.x * scale + pivotX).tolist())
+        ys = [pivotY]
+        ys.extend((self.y * scale + pivotY).tolist())
+        return xs, ys
+
+class Snapshot(object):
+    """A copy of the state of a pendulum that is needed for drawing and hit-testing.
+        It is filled by the thread that steps the pendulum and read by the other threads (see SnapshotBuffer);
+        the arrays are read-only views
+    """
+    def __init__(self):
+        self.version = None
+        self.geometry = None
+        self.Reserve(0)
+
+    def Reserve(self, capacity):
+        self.capacity = capacity
+        self._angles = zeros(capacity, dtype=float64)
+        self._vels = zeros(capacity, dtype=float64)
+        self._m = zeros(capacity, dtype=float64)
+        self._l = zeros(capacity, dtype=float64)
+
+    def Fill(self, pendulum):
+        n = pendulum.bobCount
+        if self.capacity < n:
+            self.Reserve(pendulum.capacity)
+
+        self.angles = self.Copy(self._angles, pendulum.angles, n)
+        self.vels = self.Copy(self._vels, pendulum.vels, n)
+        self.m = self.Copy(self._m, pendulum.m, n)
+        self.l = self.Copy(self._l, pendulum.l, n)
+
+        self.bobCount = n
+        self.idList = list(pendulum.idList)
+        self.x = pendulum.x
+        self.y = pendulum.y
+        self.scale = pendulum.scale
+        self.time = pendulum.time
+        self.version = pendulum.version
+        self.wallTime = clock()
+
+        # The geometry of the pendulum is never changed after it's computed, so it can be shared
+        self.geometry = None
+        if pendulum.geometry != None and pendulum.geometry.version == pendulum.version:
+            self.geometry = pendulum.geometry
+
+    def Copy(self, buffer, array, n):
+        view = buffer[:n]
+        view[:] = array
+        view = view.view()
+        view.flags.writeable = False
+        return view
+
+    def GetGeometry(self):
+        if self.geometry == None:
+            self.geometry = ChainGeometry(self.angles, self.l, self.version)
+        return self.geometry
+
+class SnapshotBuffer(object):
+    """Triple buffer of Snapshots for one writing thread and one reading thread, without locks.
+        Publish() fills a snapshot that is neither the latest one nor the one held by the reader,
+        then makes it the latest one with a single assignment. Acquire() returns the latest snapshot
+        and holds it: it isn't changed until the next call to Acquire()
+    """
+    def __init__(self):
+        self.snapshots = [Snapshot(), Snapshot(), Snapshot()]
+        self.latest = None
+        self.reading = None
+
+    def Publish(self, pendulum):
+        latest = self.latest
+        reading = self.reading
+        for snapshot in self.snapshots:
+            if snapshot is not latest and snapshot is not reading:
+                break
+        snapshot.Fill(pendulum)
+        self.latest = snapshot
+
+    def Acquire(self):
+        while True:
+            latest = self.latest
+            self.reading = latest
+            # If the writer published meanwhile, 'latest' may be being refilled, so try again
+            if self.latest is latest:
+                return latest
+
+class SnapshotCopy(object):
+    """A copy of a snapshot, with the same interface, that the reader can keep as long as it wants"""
+    def __init__(self, snapshot):
+        self.bobCount = snapshot.bobCount
+        self.angles = numpy.array(snapshot.angles)
+        self.vels = numpy.array(snapshot.vels)
+        self.m = numpy.array(snapshot.m)
+        self.l = numpy.array(snapshot.l)
+        self.idList = list(snapshot.idList)
+        self.x = snapshot.x
+        self.y = snapshot.y
+        self.scale = snapshot.scale
+        self.time = snapshot.time
+        self.wallTime = snapshot.wallTime
+        self.geometry = None
+
+    def Interpolate(self, next, alpha):
+        """Returns the state between this one (alpha = 0) and next (alpha = 1), interpolating the angles"""
+        state = copy.copy(next)
+        state.angles = self.angles + (next.angles - self.angles) * alpha
+        state.x = self.x + (next.x - self.x) * alpha
+        state.y = self.y + (next.y - self.y) * alpha
+        state.time = self.time + (next.time - self.time) * alpha
+        state.geometry = None
+        return state
+
+    def GetGeometry(self):
+        if self.geometry == None:
+            self.geometry = ChainGeometry(self.angles, self.l, None)
+        return self.geometry
+
+class SnapshotInterpolator(object):
+    """Keeps copies of the two latest snapshots seen by the renderer and returns the state between them at the render time.
+        The drawn state is one publishing interval behind the physics, so the motion is smooth whatever the rates
+        of the physics and of the drawing. Snapshots further apart than maxInterval (e.g. after a pause) aren't interpolated
+    """
+    def __init__(self, maxInterval=0.1):
+        self.maxInterval = maxInterval
+        self.previous = None
+        self.current = None
+
+    def Get(self, snapshot, renderTime):
+        if self.current == None or snapshot.wallTime != self.current.wallTime:
+            self.previous = self.current
+            self.current = SnapshotCopy(snapshot)
+
+        previous = self.previous
+        current = self.current
+        if previous == None or previous.idList != current.idList:
+            return current
+        interval = current.wallTime - previous.wallTime
+        if interval <= 0 or interval > self.maxInterval:
+            return current
+
+        alpha = min(max((renderTime - current.wallTime) / interval, 0.), 1.)
+        return previous.Interpolate(current, alpha)
+
+class PendulumBase(Updatable):
+
+    frictionCoefficient = 0
+
+    # The solvers that can be used by Accelerations()
+    # The dense one solves the whole linear system, the recursive one exploits the chain structure
+    SOLVER_DENSE = 'dense'
+    SOLVER_RECURSIVE = 'recursive'
+
+    # The ways the dense system can be assembled
+    # The loop one fills the arrays element by element, the vectorized one uses whole-array operations
+    ASSEMBLY_LOOP = 'loop'
+    ASSEMBLY_VECTORIZED = 'vectorized'
+
+    CLOSED_FORM_MAX_BOBS = 3
+
+    def __init__(self, x, y, timeInterval):
+        Updatable.__init__(self, updateInterval=timeInterval)
+
+        self.x = x
+        self.y = y
+
+        self.bobCount = 0
+
+        self.g = 9.8
+        self.deltaT = timeInterval
+        self.scale = 100
+
+        # The bob data is kept in contiguous arrays with room for 'capacity' bobs
+        # Only the first 'bobCount' elements are used - the angles, vels, m and l properties are views over them
+        self.capacity = 0
+        self._angles = zeros(0, dtype=float64)
+        self._vels = zeros(0, dtype=float64)
+        self._m = zeros(0, dtype=float64)
+        self._l = zeros(0, dtype=float64)
+
+        # The work arrays are created by InitArrays() when the dense solver needs them
+        self.arraysSize = None
+        self.A = None
+        self.B = None
+        self.lc = None
+        self.ls = None
+        self.lcv = None
+        self.lsv = None
+
+        self.solver = self.SOLVER_DENSE
+        # Pendulums with at most CLOSED_FORM_MAX_BOBS bobs skip the solver and use the closed-form equations
+        self.closedForm = True
+        self.assembly = self.ASSEMBLY_LOOP
+
+        # Index arrays used by the vectorized assembly to write into A
+        self.lowerRows = None
+        self.lowerCols = None
+        self.tensionRows = None
+        self.tensionCols = None
+
+        self.integrator = integrators.SemiImplicitEuler()
+        # The simulated time and how many times the accelerations were computed
+        self.time = 0
+        self.evaluations = 0
+
+        # The version changes every time the state changes, so the cached geometry can be recomputed only when needed
+        self.version = 0
+        self.geometry = None
+
+        self.idList = []
+
+        # The state published for drawing and hit-testing from other threads
+        self.snapshots = SnapshotBuffer()
+        self.snapshots.Publish(self)
+        # A snapshot of a copy of the pendulum that is stepped somewhere else, see SetExternalSnapshot()
+        self.externalSnapshot = None
+
+    # The properties are views over the bob data. Assigning to them (pendulum.angles = a) changes the version,
+    # but writing through the view (pendulum.angles[:] = a) doesn't: Invalidate() must be called after it,
+    # or the cached geometry (and the solvers that use it) and Publish() will see the old state
+    @property
+    def angles(self):
+        return self._angles[:self.bobCount]
+
+    @angles.setter
+    def angles(self, values):
+        self._angles[:self.bobCount] = values
+        self.Invalidate()
+
+    @property
+    def vels(self):
+        return self._vels[:self.bobCount]
+
+    @vels.setter
+    def vels(self, values):
+        self._vels[:self.bobCount] = values
+
+    @property
+    def m(self):
+        return self._m[:self.bobCount]
+
+    @m.setter
+    def m(self, values):
+        self._m[:self.bobCount] = values
+
+    @property
+    def l(self):
+        return self._l[:self.bobCount]
+
+    @l.setter
+    def l(self, values):
+        self._l[:self.bobCount] = values
+        self.Invalidate()
+
+    def Invalidate(self):
+        """Must be called after the angles or the lengths are changed in place"""
+        self.version += 1
+
+    def Publish(self):
+        """Publishes a snapshot of the current state, if it changed since the last one (then it returns True).
+            Only one thread may publish at a time (the one that steps the pendulum)"""
+        latest = self.snapshots.latest
+        if latest.version == self.version and latest.x == self.x and latest.y == self.y:
+            return False
+        self.snapshots.Publish(self)
+        return True
+
+    def GetSnapshot(self):
+        """Returns the latest published snapshot. It stays valid until the next call from the same thread"""
+        if self.externalSnapshot != None:
+            return self.externalSnapshot
+        return self.snapshots.Acquire()
+
+    def SetExternalSnapshot(self, snapshot):
+        """Makes GetSnapshot() return 'snapshot' (e.g. the state of a copy stepped by another process).
+            None goes back to the snapshots published by this pendulum"""
+        self.externalSnapshot = snapshot
+
+    def GetGeometry(self):
+        """Returns the ChainGeometry of the current state, computing it only if the state changed"""
+        geometry = self.geometry
+        if geometry == None or geometry.version != self.version:
+            geometry = ChainGeometry(self.angles, self.l, self.version)
+            self.geometry = geometry
+        return geometry
+
+    def Reserve(self, capacity):
+        """Makes room for at least 'capacity' bobs without reallocating"""
+        if capacity <= self.capacity:
+            return
+
+        n = self.bobCount
+        for name in ('_angles', '_vels', '_m', '_l'):
+            old = getattr(self, name)
+            new = zeros(capacity, dtype=float64)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def InitArrays(self):
+        n = self.bobCount
+        self.arraysSize = n
+        self.A = zeros((2 * n , 2 * n), dtype=float64)
+        self.B = zeros(2 * n, dtype=float64)
+        self.lc = zeros(n, dtype=float64)
+        self.ls = zeros(n, dtype=float64)
+        self.lcv = zeros(n, dtype=float64)
+        self.lsv = zeros(n, dtype=float64)
+
+        # A[2 * i][j] for j <= i are the lower triangle entries, A[2 * i][n + i] are the tension entries
+        rows, cols = numpy.tril_indices(n)
+        self.lowerRows = 2 * rows
+        self.lowerCols = cols
+        self.tensionRows = 2 * numpy.arange(n)
+        self.tensionCols = n + numpy.arange(n)
+
+    def InsertBob(self, bobId, pos=-1, mass=10, length=100, angle=0, velocity=0):
+        #Here I should raise an exception if the bobId is already used
+        
+        n = self.bobCount
+        if pos == -1:
+            pos = n
+        # The other positions are handled like list.insert(): negative ones count from the end, and they are clamped
+        if pos < 0:
+            pos = max(0, n + pos)
+        pos = min(pos, n)
+
+        if n == self.capacity:
+            # Doubling the capacity makes adding n bobs cost O(n) in total
+            self.Reserve(max(4, 2 * self.capacity))
+
+        self.idList.insert(pos, bobId)
+
+        for array, value in ((self._m, mass), (self._l, length / self.scale), (self._vels, velocity), (self._angles, angle)):
+            array[pos + 1:n + 1] = array[pos:n]
+            array[pos] = value
+
+        self.bobCount += 1
+        self.Invalidate()
+
+    def AddBob(self, bobId, mass=10, length=100, angle=0, velocity=0):
+        self.InsertBob(bobId, self.bobCount, mass, length, angle, velocity)
+
+    def RemoveBob(self, bobId):
+        n = self.bobCount
+        index = self.idList.index(bobId)
+        self.idList.pop(index)
+
+        for array in (self._m, self._l, self._vels, self._angles):
+            array[index:n - 1] = array[index + 1:n]
+
+        self.bobCount -= 1
+        self.Invalidate()
+
+    def SetBob(self, bobId, mass=None, length=None, angle=None, velocity=None):
+        index = self.idList.index(bobId)
+        if mass != None:
+            self._m[index] = mass
+        if length != None:
+            self._l[index] = length / self.scale
+        if angle != None:
+            self._angles[index] = angle
+        if velocity != None:
+            self._vels[index] = velocity
+        self.Invalidate()
+
+    def SetSolver(self, solver):
+        assert(solver in (self.SOLVER_DENSE, self.SOLVER_RECURSIVE)), "Unknown solver: " + str(solver)
+        self.solver = solver
+
+    def GetSolver(self):
+        return self.solver
+
+    def SetClosedForm(self, closedForm=True):
+        self.closedForm = closedForm
+
+    def IsClosedForm(self):
+        return self.closedForm
+
+    def SetAssembly(self, assembly):
+        assert(assembly in (self.ASSEMBLY_LOOP, self.ASSEMBLY_VECTORIZED)), "Unknown assembly: " + str(assembly)
+        self.assembly = assembly
+
+    def GetAssembly(self):
+        return self.assembly
+
+    def SetIntegrator(self, integrator, timeInterval=None):
+        """integrator is an integrators.Integrator instance or the name of one ('euler', 'verlet', 'rk4', 'rk45').
+            A higher order integrator needs fewer, longer steps, so the time interval can be changed with it;
+            an UpdateScheduler must then be told with Reschedule()"""
+        if not isinstance(integrator, integrators.Integrator):
+            integrator = integrators.CreateIntegrator(integrator)
+        self.integrator = integrator
+        if timeInterval != None:
+            self.updateInterval = timeInterval
+            # The interval is kept if it's out of the range allowed by Updatable
+            self.deltaT = self.updateInterval
+
+    def GetIntegrator(self):
+        return self.integrator
+
+    def GetEvaluationCount(self):
+        return self.evaluations
+
+    def GetEvaluationsPerSecond(self):
+        """The average number of Accelerations() calls per simulated second"""
+        if self.time == 0:
+            return 0
+        return self.evaluations / self.time
+
+    def ResetEvaluationCount(self):
+        self.time = 0
+        self.evaluations = 0
+
+    def GetState(self):
+        """Returns copies of the angles and the velocities as arrays"""
+        return self.angles.copy(), self.vels.copy()
+
+    def SetState(self, angles, vels):
+        self.angles[:] = angles
+        self.vels[:] = vels
+        self.Invalidate()
+
+    def Derivatives(self, angles, vels):
+        """Returns the derivatives of the angles and of the velocities in the given state.
+            The pendulum is left in that state
+        """
+        self.SetState(angles, vels)
+        acc = self.Accelerations()
+        return self.vels.copy(), acc
+
+    def Accelerations(self):
+        if self.bobCount == 0:
+            return
+
+        self.evaluations += 1
+        n = self.bobCount
+
+        #Check boundaries
+        v = self.vels
+        v[v < -100] = 100
+        v[v > 100] = 100
+
+        if self.closedForm and n <= self.CLOSED_FORM_MAX_BOBS:
+            return self.ClosedFormAccelerations()
+        if self.solver == self.SOLVER_RECURSIVE:
+            return self.RecursiveAccelerations()
+        return self.DenseAccelerations()
+
+    def DenseAccelerations(self):
+        """Builds the full 2n x 2n system (bob accelerations and rod tensions) and solves it - O(n^3)"""
+        n = self.bobCount
+        if self.arraysSize != n:
+            self.InitArrays()
+
+        if self.assembly == self.ASSEMBLY_VECTORIZED:
+            self.AssembleVectorized()
+        else:
+            self.AssembleLoop()
+
+        assert(not numpy.isnan(self.A).any() and not numpy.isnan(self.B).any()), "There are NaN values in the arrays - physics.py Accelerations()"
+
+
+        acc = solve(self.A, self.B)
+        return acc[:n]
+
+    def AssembleLoop(self):
+        n = self.bobCount
+        a = self.angles.tolist()
+        v = self.vels.tolist()
+        l = self.l.tolist()
+        m = self.m.tolist()
+
+        for i in range(0, n):
+            self.lc[i] = l[i] * cos(a[i])
+            self.ls[i] = l[i] * sin(a[i])
+            self.lcv[i] = self.lc[i] * v[i] * v[i]
+            self.lsv[i] = self.ls[i] * v[i] * v[i]
+        for i in range(0, n):
+            for j in range(0, i + 1):
+                self.A[2 * i][j] = - self.lc[j]
+                self.A[2 * i + 1][j] = - self.ls[j]
+
+            frictionX = abs(v[i]) * self.frictionCoefficient * cos(a[i])
+            frictionY = abs(v[i]) * self.frictionCoefficient * sin(a[i])
+
+            if v[i] < 0:
+                frictionX *= -1
+                frictionY *= -1
+
+            self.B[2 * i] = - self.lsv[i] + frictionX
+            self.B[2 * i + 1] = self.lcv[i] + frictionY
+
+            if i > 0:
+                self.B[2 * i] += self.B[2 * i - 2]
+                self.B[2 * i + 1] += self.B[2 * i - 1]
+            else:
+                self.B[2 * i + 1] += self.g
+            self.A[2 * i][n + i] = - sin(a[i]) / m[i]
+            self.A[2 * i + 1][n + i] = cos(a[i]) / m[i]
+            if i == n - 1:
+                continue
+            self.A[2 * i][n + i + 1] = sin(a[i + 1]) / m[i]
+            self.A[2 * i + 1][n + i + 1] = - cos(a[i + 1]) / m[i]
+
+    def AssembleVectorized(self):
+        """Fills the same A and B as AssembleLoop(), using one sin/cos per bob and whole-array operations"""
+        v = self.vels
+        l = self.l
+        m = self.m
+
+        geometry = self.GetGeometry()
+        s = geometry.sin
+        c = geometry.cos
+        numpy.multiply(l, c, out=self.lc)
+        numpy.multiply(l, s, out=self.ls)
+        numpy.multiply(self.lc * v, v, out=self.lcv)
+        numpy.multiply(self.ls * v, v, out=self.lsv)
+
+        self.A[self.lowerRows, self.lowerCols] = - self.lc[self.lowerCols]
+        self.A[self.lowerRows + 1, self.lowerCols] = - self.ls[self.lowerCols]
+
+        self.A[self.tensionRows, self.tensionCols] = - s / m
+        self.A[self.tensionRows + 1, self.tensionCols] = c / m
+        self.A[self.tensionRows[:-1], self.tensionCols[1:]] = s[1:] / m[:-1]
+        self.A[self.tensionRows[:-1] + 1, self.tensionCols[1:]] = - c[1:] / m[:-1]
+
+        speed = numpy.abs(v) * self.frictionCoefficient
+        frictionX = speed * c
+        frictionY = speed * s
+        negative = v < 0
+        frictionX[negative] *= -1
+        frictionY[negative] *= -1
+
+        # Every bob adds the terms of the bobs above it
+        termsX = - self.lsv + frictionX
+        termsY = self.lcv + frictionY
+        termsY[0] += self.g
+        numpy.cumsum(termsX, out=self.B[0::2])
+        numpy.cumsum(termsY, out=self.B[1::2])
+
+    def RecursiveAccelerations(self):
+        """Same accelerations as DenseAccelerations(), but in O(n).
+            Projecting the equations of every bob on the normal of its rod removes the angular accelerations,
+            which leaves a tridiagonal system in the rod tensions T:
+                T[0] / m[0] - C[0] / m[0] * T[1] = l[0] * v[0]^2 + g * cos(a[0])
+                - C[i-1] / m[i-1] * T[i-1] + (1 / m[i] + 1 / m[i-1]) * T[i] - C[i] / m[i] * T[i+1] = l[i] * v[i]^2
+            where C[i] = cos(a[i] - a[i+1]) and T[n] = 0. It is solved with a forward/backward sweep (Thomas algorithm).
+            Projecting on the rods gives the angular accelerations, with S[i] = sin(a[i] - a[i+1]):
+                acc[i] = (T[i-1] * S[i-1] / m[i-1] - T[i+1] * S[i] / m[i] - friction * v[i] - g * sin(a[0]) if i == 0) / l[i]
+        """
+        n = self.bobCount
+        v = self.vels
+        l = self.l
+        invM = 1. / self.m
+
+        geometry = self.GetGeometry()
+        s = geometry.sin
+        c = geometry.cos
+        # cos and sin of the angle between two consecutive rods
+        C = (c[:-1] * c[1:] + s[:-1] * s[1:]).tolist()
+        S = (s[:-1] * c[1:] - c[:-1] * s[1:]).tolist()
+
+        # The tridiagonal system: lower[i] * T[i-1] + diag[i] * T[i] + upper[i] * T[i+1] = rhs[i]
+        diag = invM.copy()
+        diag[1:] += invM[:-1]
+        diag = diag.tolist()
+        rhs = l * v * v
+        rhs[0] += self.g * c[0]
+        rhs = rhs.tolist()
+        invM = invM.tolist()
+
+        # Forward sweep
+        upper = [0.] * n
+        for i in range(0, n - 1):
+            upper[i] = - C[i] * invM[i]
+        for i in range(1, n):
+            # lower[i] == upper[i - 1]
+            w = upper[i - 1] / diag[i - 1]
+            diag[i] -= w * upper[i - 1]
+            rhs[i] -= w * rhs[i - 1]
+
+        # Backward sweep
+        T = [0.] * (n + 1)
+        T[n - 1] = rhs[n - 1] / diag[n - 1]
+        for i in range(n - 2, -1, -1):
+            T[i] = (rhs[i] - upper[i] * T[i + 1]) / diag[i]
+
+        acc = - self.frictionCoefficient * v
+        acc[0] -= self.g * s[0]
+        for i in range(0, n - 1):
+            acc[i] -= T[i + 1] * S[i] * invM[i]
+            acc[i + 1] += T[i] * S[i] * invM[i]
+        acc /= l
+
+        assert(not numpy.isnan(acc).any()), "There are NaN values in the accelerations - physics.py RecursiveAccelerations()"
+
+        return acc
+
+    def ClosedFormAccelerations(self):
+        """Accelerations of pendulums with 1, 2 or 3 bobs, without any linear solve.
+            These are the equations of RecursiveAccelerations() with the tension system solved by hand
+        """
+        n = self.bobCount
+        if n == 1:
+            return self.SingleAccelerations()
+        if n == 2:
+            return self.DoubleAccelerations()
+        return self.TripleAccelerations()
+
+    def SingleAccelerations(self):
+        a0, = self.angles.tolist()
+        v0, = self.vels.tolist()
+        l0, = self.l.tolist()
+        acc0 = (- self.g * sin(a0) - self.frictionCoefficient * v0) / l0
+        return numpy.array([acc0], dtype=float64)
+
+    def DoubleAccelerations(self):
+        a0, a1 = self.angles.tolist()
+        v0, v1 = self.vels.tolist()
+        l0, l1 = self.l.tolist()
+        m0, m1 = self.m.tolist()
+        im0, im1 = 1. / m0, 1. / m1
+        g = self.g
+        k = self.frictionCoefficient
+
+        C0 = cos(a0 - a1)
+        S0 = sin(a0 - a1)
+
+        # Tensions: [d0 u0; u0 d1] * [T0; T1] = [r0; r1]
+        d0 = im0
+        d1 = im0 + im1
+        u0 = - C0 * im0
+        r0 = l0 * v0 * v0 + g * cos(a0)
+        r1 = l1 * v1 * v1
+        det = d0 * d1 - u0 * u0
+        T0 = (d1 * r0 - u0 * r1) / det
+        T1 = (d0 * r1 - u0 * r0) / det
+
+        acc0 = (- T1 * S0 * im0 - k * v0 - g * sin(a0)) / l0
+        acc1 = (T0 * S0 * im0 - k * v1) / l1
+        return numpy.array([acc0, acc1], dtype=float64)
+
+    def TripleAccelerations(self):
+        a0, a1, a2 = self.angles.tolist()
+        v0, v1, v2 = self.vels.tolist()
+        l0, l1, l2 = self.l.tolist()
+        m0, m1, m2 = self.m.tolist()
+        im0, im1, im2 = 1. / m0, 1. / m1, 1. / m2
+        g = self.g
+        k = self.frictionCoefficient
+
+        C0 = cos(a0 - a1)
+        S0 = sin(a0 - a1)
+        C1 = cos(a1 - a2)
+        S1 = sin(a1 - a2)
+
+        # Tensions: [d0 u0 0; u0 d1 u1; 0 u1 d2] * [T0; T1; T2] = [r0; r1; r2]
+        d0 = im0
+        d1 = im0 + im1
+        d2 = im1 + im2
+        u0 = - C0 * im0
+        u1 = - C1 * im1
+        r0 = l0 * v0 * v0 + g * cos(a0)
+        r1 = l1 * v1 * v1
+        r2 = l2 * v2 * v2
+
+        # The inverse of the symmetric matrix from its cofactors
+        i00 = d1 * d2 - u1 * u1
+        i01 = - u0 * d2
+        i02 = u0 * u1
+        i11 = d0 * d2
+        i12 = - d0 * u1
+        i22 = d0 * d1 - u0 * u0
+        det = d0 * i00 + u0 * i01
+        T0 = (i00 * r0 + i01 * r1 + i02 * r2) / det
+        T1 = (i01 * r0 + i11 * r1 + i12 * r2) / det
+        T2 = (i02 * r0 + i12 * r1 + i22 * r2) / det
+
+        acc0 = (- T1 * S0 * im0 - k * v0 - g * sin(a0)) / l0
+        acc1 = (T0 * S0 * im0 - T2 * S1 * im1 - k * v1) / l1
+        acc2 = (T1 * S1 * im1 - k * v2) / l2
+        return numpy.array([acc0, acc1, acc2], dtype=float64)
+
+    # The integrators change the angles through SetState() or the angles setter, which already change the version;
+    # invalidating again would make RK45 think the pendulum was edited between two steps
+    def UpdateData(self):
+        self.integrator.Step(self, self.deltaT)
+        self.time += self.deltaT
+
+    def UpdateSteps(self, steps):
+        # The same as calling UpdateData() 'steps' times, without the per step overhead
+        step = self.integrator.Step
+        deltaT = self.deltaT
+        for i in range(steps):
+            step(self, deltaT)
+            self.time += deltaT
+
+    def GetX(self):
+        return self.x
+
+    def SetX(self, x):
+        self.x = x
+
+    def GetY(self):
+        return self.y
+
+    def SetY(self, y):
+        self.y = y
+
+    def GetVariableObjects(self):
+        """The arrays are views over the bob data, they are valid until a bob is inserted or removed"""
+        return {
+            "angles": self.angles, 
+            "velocities": self.vels,
+            "masses": self.m,
+            "lengths": self.l,
+            "g": self.g}
+    
+    @property
+    def timeInterval(self):
+        return self.deltaT
+    
+    @timeInterval.setter
+    def timeInterval(self, timeInterval):
+        self.deltaT = timeInterval
+
+class PendulumEnsemble(Updatable):
+    """Holds 'count' pendulums that have the same number of bobs as (count, bobCount) arrays
+        and advances all of them with one batched solve per step.
+        Every member follows the same equations as PendulumBase with the dense solver.
+    """
+
+    frictionCoefficient = 0
+
+    def __init__(self, count, bobCount, timeInterval, mass=10, length=100, angle=0, velocity=0):
+        Updatable.__init__(self, updateInterval=timeInterval)
+
+        self.count = count
+        self.bobCount = bobCount
+
+        # g can also be a (count,) array, for members with different gravity
+        self.g = 9.8
+        self.deltaT = timeInterval
+        self.scale = 100
+        self.time = 0
+
+        shape = (count, bobCount)
+        self.x = zeros(count, dtype=float64)
+        self.y = zeros(count, dtype=float64)
+        self.angles = numpy.full(shape, angle, dtype=float64)
+        self.vels = numpy.full(shape, velocity, dtype=float64)
+        self.m = numpy.full(shape, mass, dtype=float64)
+        self.l = numpy.full(shape, length / self.scale, dtype=float64)
+
+        n = bobCount
+        self.A = zeros((count, 2 * n, 2 * n), dtype=float64)
+        self.B = zeros((count, 2 * n), dtype=float64)
+
+        rows, cols = numpy.tril_indices(n)
+        self.lowerRows = 2 * rows
+        self.lowerCols = cols
+        self.tensionRows = 2 * numpy.arange(n)
+        self.tensionCols = n + numpy.arange(n)
+
+    @classmethod
+    def FromPendulums(cls, pendulums):
+        """Builds an ensemble from a list of PendulumBase objects with the same bob count and time interval"""
+        assert(len(pendulums) > 0), "FromPendulums() needs at least one pendulum"
+        first = pendulums[0]
+        n = first.bobCount
+        for pendulum in pendulums:
+            assert(pendulum.bobCount == n), "All the pendulums of an ensemble must have the same bob count"
+            assert(pendulum.deltaT == first.deltaT), "All the pendulums of an ensemble must have the same time interval"
+
+        ensemble = cls(len(pendulums), n, first.deltaT)
+        ensemble.g = first.g
+        ensemble.scale = first.scale
+        ensemble.frictionCoefficient = first.frictionCoefficient
+        for k, pendulum in enumerate(pendulums):
+            ensemble.x[k] = pendulum.x
+            ensemble.y[k] = pendulum.y
+            ensemble.angles[k] = pendulum.angles
+            ensemble.vels[k] = pendulum.vels
+            ensemble.m[k] = pendulum.m
+            ensemble.l[k] = pendulum.l
+
+        return ensemble
+
+    def ExportTo(self, pendulums):
+        """Writes the state of every member back to the respective PendulumBase object"""
+        assert(len(pendulums) == self.count), "ExportTo() needs one pendulum for every member"
+        n = self.bobCount
+        for k, pendulum in enumerate(pendulums):
+            assert(pendulum.bobCount == n), "All the pendulums of an ensemble must have the same bob count"
+            pendulum.x = float(self.x[k])
+            pendulum.y = float(self.y[k])
+            pendulum.m = self.m[k]
+            pendulum.l = self.l[k]
+            # SetState() changes the version, so the cached geometry is recomputed
+            pendulum.SetState(self.angles[k], self.vels[k])
+
+    def ToPendulums(self, cls=PendulumBase):
+        """Creates a new pendulum for every member. The bobs get the ids 1..bobCount"""
+        pendulums = []
+        for k in range(0, self.count):
+            pendulum = cls(float(self.x[k]), float(self.y[k]), self.deltaT)
+            if numpy.ndim(self.g) == 0:
+                pendulum.g = self.g
+            else:
+                pendulum.g = float(self.g[k])
+            pendulum.frictionCoefficient = self.frictionCoefficient
+            pendulum.scale = self.scale
+            pendulum.Reserve(self.bobCount)
+            for i in range(0, self.bobCount):
+                pendulum.AddBob(i + 1)
+            pendulums.append(pendulum)
+        self.ExportTo(pendulums)
+
+        return pendulums
+
+    def Accelerations(self):
+        """Returns the (count, bobCount) array of angular accelerations"""
+        n = self.bobCount
+        if n == 0:
+            return zeros((self.count, 0), dtype=float64)
+
+        #Check boundaries
+        v = self.vels
+        v[v < -100] = 100
+        v[v > 100] = 100
+
+        s = numpy.sin(self.angles)
+        c = numpy.cos(self.angles)
+        lc = self.l * c
+        ls = self.l * s
+
+        A = self.A
+        A[:, self.lowerRows, self.lowerCols] = - lc[:, self.lowerCols]
+        A[:, self.lowerRows + 1, self.lowerCols] = - ls[:, self.lowerCols]
+
+        A[:, self.tensionRows, self.tensionCols] = - s / self.m
+        A[:, self.tensionRows + 1, self.tensionCols] = c / self.m
+        A[:, self.tensionRows[:-1], self.tensionCols[1:]] = s[:, 1:] / self.m[:, :-1]
+        A[:, self.tensionRows[:-1] + 1, self.tensionCols[1:]] = - c[:, 1:] / self.m[:, :-1]
+
+        speed = numpy.abs(v) * self.frictionCoefficient
+        frictionX = speed * c
+        frictionY = speed * s
+        negative = v < 0
+        frictionX[negative] *= -1
+        frictionY[negative] *= -1
+
+        termsX = - ls * v * v + frictionX
+        termsY = lc * v * v + frictionY
+        termsY[:, 0] += self.g
+        numpy.cumsum(termsX, axis=1, out=self.B[:, 0::2])
+        numpy.cumsum(termsY, axis=1, out=self.B[:, 1::2])
+
+        assert(not numpy.isnan(A).any() and not numpy.isnan(self.B).any()), "There are NaN values in the arrays - physics.py PendulumEnsemble.Accelerations()"
+
+        acc = solve(A, self.B[:, :, None])
+        return acc[:, :n, 0]
+
+    def UpdateData(self):
+        acc = self.Accelerations()
+        self.vels += acc * self.deltaT
+        self.angles += self.vels * self.deltaT
+        self.time += self.deltaT
+
+    def PotentialEnergy(self):
+        """Returns the (count,) array of potential energies, the same as EnergyExtensionBase.GetPotentialEnergy()"""
+        heights = numpy.cumsum(self.l, axis=1) - numpy.cumsum(self.l * numpy.cos(self.angles), axis=1)
+        return (self.m * heights).sum(axis=1) * self.g
+
+    def KineticEnergy(self):
+        """Returns the (count,) array of kinetic energies, the same as EnergyExtensionBase.GetKineticEnergy()"""
+        lv = self.l * self.vels
+        vx = numpy.cumsum(lv * numpy.cos(self.angles), axis=1)
+        vy = numpy.cumsum(lv * numpy.sin(self.angles), axis=1)
+        return (self.m * (vx * vx + vy * vy)).sum(axis=1) / 2
+
+    def Step(self, steps=1):
+        """Advances every member by 'steps' time intervals"""
+        for i in xrange(0, int(steps)):
+            self.UpdateData()
+
+    @property
+    def timeInterval(self):
+        return self.deltaT
+
+    @timeInterval.setter
+    def timeInterval(self, timeInterval):
+        self.deltaT = timeInterval
+
+class CollisionState():
+    def __init__(self, pivot=False, bobIndex=0, lastBob=False, rod=False, id=0):
+        self.pivot = pivot
+        self.bobIndex = bobIndex
+        self.lastBob = lastBob
+        self.rod = rod
+        self.id = id
+
+if __name__ == '__main__':
+    # Import-time check: the physics modules must load through the package without pulling in wx, within a time budget
+    import os
+    import sys
+    import subprocess
+
+    budget = 2.
+    code = "; ".join([
+        "import sys, time",
+        "t = time.time()",
+        "import pendulumscripts.physics, pendulumscripts.energy, pendulumscripts.integrators, pendulumscripts.run",
+        "sys.stdout.write(str(time.time() - t) + ' ' + str('wx' in sys.modules or 'pendulumscripts.main' in sys.modules))"])
+    packageParent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=packageParent)
+    elapsed, guiImported = output.split()
+    elapsed = float(elapsed)
+
+    print 'Import time: ' + str(elapsed) + ' s (budget ' + str(budget) + ' s)'
+    print 'GUI imported: ' + guiImported
+    if guiImported != 'False' or elapsed > budget:
+        print 'FAILED'
+        sys.exit(1)
+    print 'OK'
+
+    # Solver check: the recursive solver and the closed forms must give the accelerations of the dense solver
+    tolerance = 1e-9
+    random = numpy.random.RandomState(0)
+    worst = 0
+    for friction in [0, 0.7]:
+        for n in range(1, 7):
+            for trial in range(0, 20):
+                pendulum = PendulumBase(0, 0, 0.002)
+                pendulum.frictionCoefficient = friction
+                for i in range(0, n):
+                    pendulum.AddBob(i, random.uniform(1, 20), random.uniform(20, 200), random.uniform(-numpy.pi, numpy.pi), random.uniform(-10, 10))
+
+                dense = pendulum.DenseAccelerations()
+                results = {'recursive': pendulum.RecursiveAccelerations()}
+                if n <= pendulum.CLOSED_FORM_MAX_BOBS:
+                    results['closed form'] = [pendulum.SingleAccelerations, pendulum.DoubleAccelerations, pendulum.TripleAccelerations][n - 1]()
+                for name, acc in results.items():
+                    error = numpy.abs(acc - dense).max() / max(1., numpy.abs(dense).max())
+                    worst = max(worst, error)
+                    if error > tolerance:
+                        print 'Solver check: %s differs from dense by %g (%d bobs, friction %g)' % (name, error, n, friction)
+                        print 'FAILED'
+                        sys.exit(1)
+
+    print 'Solver check: largest relative difference from dense ' + str(worst) + ' (tolerance ' + str(tolerance) + ')'
+    print 'OK'
@@ -0,0 +1,353 @@
+"""
+    Running the physics in a child process, so the simulation and the user interface don't share the GIL.
+        process = PhysicsProcess(ticksPerSecond=500)
+        process.LoadScene(SceneToDict(pendulums))
+        process.SetPaused(False)
+        ...
+        frame = process.GetFrame()      # the latest published state, read from shared memory without copying
+        ...
+        process.SetPaused(True)
+        states = process.GetState()     # the exact state of every pendulum, sent back over the pipe
+        process.Stop()
+    The child steps the pendulums of the scene with the same schedulers as the SimulationWindow and writes a frame
+    into a ring of shared arrays after every tick. The edits are sent over a pipe and applied between two ticks
+"""
+from __future__ import division
+import copy
+import time
+import ctypes
+import threading
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray, RawValue
+import numpy
+from numpy import float64, int32, int64
+from physics import ChainGeometry
+from scene import SceneFromDict
+from scheduler import FixedStepScheduler, UpdateScheduler, CommandQueue, clock
+
+class FrameRing(object):
+    """A ring of frameCount frames in shared memory, written by one process and read by the others.
+        A frame holds the angles, the velocities and the pivot of up to maxPendulums pendulums with up to maxBobs bobs.
+        The sequence number of a frame is odd while the frame is written, so a reader can check if it changed under it
+    """
+    def __init__(self, maxPendulums=64, maxBobs=64, frameCount=8):
+        self.maxPendulums = maxPendulums
+        self.maxBobs = maxBobs
+        self.frameCount = frameCount
+
+        self.buffers = {
+            'angles': RawArray(ctypes.c_double, frameCount * maxPendulums * maxBobs),
+            'vels': RawArray(ctypes.c_double, frameCount * maxPendulums * maxBobs),
+            'pivots': RawArray(ctypes.c_double, frameCount * maxPendulums * 2),
+            'bobCounts': RawArray(ctypes.c_int32, frameCount * maxPendulums),
+            'counts': RawArray(ctypes.c_int32, frameCount),
+            'times': RawArray(ctypes.c_double, frameCount),
+            # time.time() when the frame was written; unlike clock(), it's the same in all the processes
+            'wallTimes': RawArray(ctypes.c_double, frameCount),
+            'sequences': RawArray(ctypes.c_int64, frameCount)}
+        # The index of the last complete frame, -1 before the first one
+        self.latest = RawValue(ctypes.c_int32, -1)
+        self.Map()
+
+    def Map(self):
+        """Creates the numpy views over the shared buffers"""
+        frameCount, maxPendulums, maxBobs = self.frameCount, self.maxPendulums, self.maxBobs
+        self.angles = numpy.frombuffer(self.buffers['angles'], dtype=float64).reshape(frameCount, maxPendulums, maxBobs)
+        self.vels = numpy.frombuffer(self.buffers['vels'], dtype=float64).reshape(frameCount, maxPendulums, maxBobs)
+        self.pivots = numpy.frombuffer(self.buffers['pivots'], dtype=float64).reshape(frameCount, maxPendulums, 2)
+        self.bobCounts = numpy.frombuffer(self.buffers['bobCounts'], dtype=int32).reshape(frameCount, maxPendulums)
+        self.counts = numpy.frombuffer(self.buffers['counts'], dtype=int32)
+        self.times = numpy.frombuffer(self.buffers['times'], dtype=float64)
+        self.wallTimes = numpy.frombuffer(self.buffers['wallTimes'], dtype=float64)
+        self.sequences = numpy.frombuffer(self.buffers['sequences'], dtype=int64)
+
+    # The shared buffers are passed to the child process; the views are created again on the other side
+    def __getstate__(self):
+        return (self.maxPendulums, self.maxBobs, self.frameCount, self.buffers, self.latest)
+
+    def __setstate__(self, state):
+        self.maxPendulums, self.maxBobs, self.frameCount, self.buffers, self.latest = state
+        self.Map()
+
+    def Write(self, pendulums, simulatedTime):
+        index = (self.latest.value + 1) % self.frameCount
+        self.sequences[index] += 1
+
+        for i, pendulum in enumerate(pendulums):
+            n = pendulum.bobCount
+            self.angles[index, i, :n] = pendulum.angles
+            self.vels[index, i, :n] = pendulum.vels
+            self.pivots[index, i] = (pendulum.x, pendulum.y)
+            self.bobCounts[index, i] = n
+        self.counts[index] = len(pendulums)
+        self.times[index] = simulatedTime
+        self.wallTimes[index] = time.time()
+
+        self.sequences[index] += 1
+        self.latest.value = index
+
+    def Read(self):
+        """Returns the latest complete Frame, or None if nothing was written yet"""
+        while True:
+            index = self.latest.value
+            if index == -1:
+                return None
+            sequence = self.sequences[index]
+            if sequence % 2 == 0:
+                return Frame(self, index, sequence)
+
+    def ReadCopy(self):
+        """Returns a copy of the latest complete Frame, or None if nothing was written yet.
+            The copy stays valid after the writer comes back to the frame; if the frame changed while it was copied, it's read again"""
+        while True:
+            frame = self.Read()
+            if frame == None:
+                return None
+            frameCopy = frame.Copy()
+            if frame.IsValid():
+                return frameCopy
+
+class Frame(object):
+    """A frame of a FrameRing. The arrays are views of the shared memory, so they are valid only while IsValid() is True;
+        with the default ring of 8 frames, the writer comes back to a frame after 8 ticks. Copy() makes a frame that stays valid"""
+    def __init__(self, ring, index, sequence):
+        self.ring = ring
+        self.index = index
+        self.sequence = sequence
+
+        self.count = int(ring.counts[index])
+        self.time = float(ring.times[index])
+        # When the frame was written, on the clock() of this process
+        self.wallTime = float(ring.wallTimes[index]) - time.time() + clock()
+        self.angles = ring.angles[index]
+        self.vels = ring.vels[index]
+        self.pivots = ring.pivots[index]
+        self.bobCounts = ring.bobCounts[index]
+
+    def IsValid(self):
+        if self.ring == None:
+            # A copy doesn't change
+            return True
+        return self.ring.sequences[self.index] == self.sequence
+
+    def Copy(self):
+        """Copies the arrays of the pendulums out of the shared memory; check IsValid() after copying"""
+        frame = copy.copy(self)
+        frame.ring = None
+        n = self.count
+        frame.angles = self.angles[:n].copy()
+        frame.vels = self.vels[:n].copy()
+        frame.pivots = self.pivots[:n].copy()
+        frame.bobCounts = self.bobCounts[:n].copy()
+        return frame
+
+class FrameSnapshot(object):
+    """A pendulum of a Frame, with the interface of physics.Snapshot so it can be drawn and hit-tested the same way.
+        The lengths, the masses and the bob ids come from the local pendulum, they don't change while the child runs
+    """
+    def __init__(self, frame, index, pendulum):
+        n = int(frame.bobCounts[index])
+        self.bobCount = n
+        self.angles = frame.angles[index, :n]
+        self.vels = frame.vels[index, :n]
+        self.x, self.y = frame.pivots[index].tolist()
+        self.time = frame.time
+        self.wallTime = frame.wallTime
+
+        self.m = pendulum.m
+        self.l = pendulum.l
+        self.scale = pendulum.scale
+        self.idList = pendulum.idList
+        self.geometry = None
+
+    def GetGeometry(self):
+        if self.geometry == None:
+            self.geometry = ChainGeometry(self.angles, self.l, None)
+        return self.geometry
+
+class PhysicsServer(object):
+    """Runs in the child process: steps the pendulums of the last scene and publishes them in the FrameRing"""
+    # The messages that are applied as commands, and the functions that apply them
+    COMMANDS = {'scene': 'LoadScene', 'pivot': 'SetPivot', 'friction': 'SetFriction', 'timeScale': 'SetTimeScale'}
+
+    def __init__(self, connection, ring, ticksPerSecond):
+        self.connection = connection
+        self.ring = ring
+        self.pendulums = []
+        self.timeScale = 1
+
+        self.updateScheduler = UpdateScheduler()
+        self.commands = CommandQueue()
+        self.scheduler = FixedStepScheduler(ticksPerSecond, self.Tick, paused=True)
+
+    def Run(self):
+        listener = threading.Thread(target=self.Listen)
+        listener.daemon = True
+        listener.start()
+        self.scheduler.Run()
+
+    def Listen(self):
+        """Receives the messages from the pipe. The edits become commands that are applied between two ticks"""
+        while True:
+            try:
+                message = self.connection.recv()
+            except EOFError:
+                message = ('stop',)
+            name, args = message[0], message[1:]
+
+            if name == 'stop':
+                self.scheduler.Stop()
+                return
+            if name == 'pause':
+                self.SetPaused(*args)
+                continue
+            if name == 'state':
+                with self.scheduler.lock:
+                    self.commands.Apply()
+                    self.connection.send(self.GetState())
+                continue
+
+            key = name
+            if name == 'pivot':
+                key = (name, args[0])
+            self.commands.Post(getattr(self, self.COMMANDS[name]), args, key=key)
+
+            # Nothing is ticking while paused, so the edit is applied (and published) right away
+            if self.scheduler.IsPaused():
+                with self.scheduler.lock:
+                    self.commands.Apply()
+                    self.Publish()
+
+    def Tick(self):
+        self.commands.Apply()
+        self.updateScheduler.Tick()
+        self.Publish()
+
+    def Publish(self):
+        simulatedTime = max([pendulum.time for pendulum in self.pendulums] + [0])
+        self.ring.Write(self.pendulums, simulatedTime)
+
+    def SetPaused(self, paused):
+        if not paused:
+            # Unpausing sets the time of the last update to now, so the paused time isn't caught up
+            for pendulum in self.pendulums:
+                pendulum.pause = False
+        self.scheduler.SetPaused(paused)
+
+    def LoadScene(self, scene):
+        for pendulum in self.pendulums:
+            self.updateScheduler.Remove(pendulum)
+        self.pendulums = SceneFromDict(scene)
+        for pendulum, description in zip(self.pendulums, scene['pendulums']):
+            pendulum.time = description.get('time', 0)
+            pendulum.timeScale = self.timeScale
+            self.updateScheduler.Add(pendulum)
+
+    def SetPivot(self, index, x, y):
+        self.pendulums[index].x = x
+        self.pendulums[index].y = y
+
+    def SetFriction(self, frictionCoefficient):
+        for pendulum in self.pendulums:
+            pendulum.frictionCoefficient = frictionCoefficient
+
+    def SetTimeScale(self, timeScale):
+        self.timeScale = timeScale
+        for pendulum in self.pendulums:
+            pendulum.timeScale = timeScale
+            self.updateScheduler.Reschedule(pendulum)
+
+    def GetState(self):
+        """The (x, y, time, angles, velocities) of every pendulum"""
+        return [(pendulum.x, pendulum.y, pendulum.time, pendulum.angles.copy(), pendulum.vels.copy())
+                for pendulum in self.pendulums]
+
+def Serve(connection, ring, ticksPerSecond):
+    """The entry point of the child process"""
+    PhysicsServer(connection, ring, ticksPerSecond).Run()
+
+class PhysicsProcess(object):
+    """Starts a child process that runs the physics. All the functions must be called from the same thread.
+        The FrameRing is sized for maxPendulums pendulums with maxBobs bobs; a bigger scene restarts the child with a bigger ring
+    """
+    def __init__(self, ticksPerSecond=500, maxPendulums=64, maxBobs=64, frameCount=8):
+        self.ticksPerSecond = ticksPerSecond
+        self.frameCount = frameCount
+        self.timeScale = 1
+        self.Start(maxPendulums, maxBobs)
+
+    def Start(self, maxPendulums, maxBobs):
+        self.ring = FrameRing(maxPendulums, maxBobs, self.frameCount)
+        self.connection, childConnection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=Serve, args=(childConnection, self.ring, self.ticksPerSecond))
+        self.process.daemon = True
+        self.process.start()
+        if self.timeScale != 1:
+            self.SetTimeScale(self.timeScale)
+
+    def LoadScene(self, scene):
+        """Replaces the pendulums of the child with the ones of the scene (see scene.SceneToDict()).
+            A pendulum description can also have a 'time' key, the simulated time it starts from.
+            If the scene doesn't fit in the ring, the child is restarted (paused) with a ring at least twice as big"""
+        pendulums = scene['pendulums']
+        pendulumCount = len(pendulums)
+        bobCount = max([len(description.get('bobs', [])) for description in pendulums] + [0])
+        if pendulumCount > self.ring.maxPendulums or bobCount > self.ring.maxBobs:
+            maxPendulums = max(pendulumCount, 2 * self.ring.maxPendulums)
+            maxBobs = max(bobCount, self.ring.maxBobs)
+            if bobCount > self.ring.maxBobs:
+                maxBobs = max(bobCount, 2 * self.ring.maxBobs)
+            self.Stop()
+            self.Start(maxPendulums, maxBobs)
+        self.connection.send(('scene', scene))
+
+    def SetPaused(self, paused):
+        self.connection.send(('pause', paused))
+
+    def SetPivot(self, index, x, y):
+        """Moves the pivot of the pendulum with the given index in the scene"""
+        self.connection.send(('pivot', index, x, y))
+
+    def SetFriction(self, frictionCoefficient):
+        self.connection.send(('friction', frictionCoefficient))
+
+    def SetTimeScale(self, timeScale):
+        self.timeScale = timeScale
+        self.connection.send(('timeScale', timeScale))
+
+    def GetState(self):
+        """Returns the (x, y, time, angles, velocities) of every pendulum, after the edits sent before"""
+        self.connection.send(('state',))
+        return self.connection.recv()
+
+    def GetFrame(self):
+        """Returns a copy of the latest frame, see FrameRing.ReadCopy()"""
+        return self.ring.ReadCopy()
+
+    def Stop(self):
+        if self.process.is_alive():
+            self.connection.send(('stop',))
+            self.process.join(1)
+
+if __name__ == '__main__':
+    from physics import PendulumBase
+    from scene import SceneToDict
+
+    pendulums = []
+    for i in range(0, 20):
+        pendulum = PendulumBase(i * 50, 0, 1. / 500)
+        for j in range(0, 3):
+            pendulum.AddBob(j, 10, 100, 1.5, 0)
+        pendulums.append(pendulum)
+
+    process = PhysicsProcess(ticksPerSecond=500)
+    process.LoadScene(SceneToDict(pendulums))
+    process.SetPaused(False)
+    start = time.time()
+    time.sleep(2)
+    frame = process.GetFrame()
+    print 'Simulated %.3fs in %.3fs, pendulum 0 angles: %s' % (frame.time, time.time() - start, frame.angles[0, :3])
+    process.SetPaused(True)
+    states = process.GetState()
+    print 'State of pendulum 0 after pausing: time %.3f, angles %s' % (states[0][2], states[0][3])
+    process.Stop()
@@ -0,0 +1,137 @@
+"""
+    A software rasteriser that draws lines and discs into a NumPy RGB array, for the scenes that are too big for the DC calls.
+        framebuffer = Framebuffer(width, height, threads=4)
+        framebuffer.AddRows(rows, colour)
+        framebuffer.AddLines(lines, colour)     # lines is an array of (x1, y1, x2, y2) rows, in pixels
+        framebuffer.AddDiscs(discs, colour)     # discs is an array of (x, y, radius) rows, in pixels
+        framebuffer.Render()                    # framebuffer.pixels now holds the image
+    The shapes are turned into pixel coordinates with vectorized NumPy code when they are added, and Render() writes them
+    into the array in the order they were added. The array is split into horizontal tiles that can be written on a thread pool
+"""
+from __future__ import division
+from multiprocessing.pool import ThreadPool
+import numpy
+
+# The kinds of the layers
+POINTS = 0
+ROWS = 1
+COLUMNS = 2
+
+class Framebuffer(object):
+    def __init__(self, width, height, threads=1, background=(255, 255, 255)):
+        self.background = background
+        self.layers = []
+        # The pixel offsets of a disc, for every radius
+        self.discOffsets = {}
+        self.pool = None
+        self.threads = 1
+        self.SetThreads(threads)
+        self.Resize(width, height)
+
+    def Resize(self, width, height):
+        self.width = width
+        self.height = height
+        # The layout (rows, columns, RGB) is the one expected by wx.Bitmap.CopyFromBuffer()
+        self.pixels = numpy.empty((height, width, 3), dtype=numpy.uint8)
+
+    def SetThreads(self, threads):
+        """The number of horizontal tiles rendered in parallel; 1 renders on the calling thread"""
+        assert(threads >= 1), "threads must be at least 1"
+        if threads == self.threads:
+            return
+        self.Close()
+        self.threads = threads
+        if threads > 1:
+            self.pool = ThreadPool(threads)
+
+    def Close(self):
+        if self.pool != None:
+            self.pool.close()
+            self.pool = None
+        self.threads = 1
+
+    def AddRows(self, rows, colour):
+        """Horizontal lines that cross the whole framebuffer"""
+        rows = numpy.rint(numpy.asarray(rows, dtype=float)).astype(int)
+        rows = rows[(rows >= 0) & (rows < self.height)]
+        self.layers.append((ROWS, rows, None, colour))
+
+    def AddColumns(self, columns, colour):
+        """Vertical lines that cross the whole framebuffer"""
+        columns = numpy.rint(numpy.asarray(columns, dtype=float)).astype(int)
+        columns = columns[(columns >= 0) & (columns < self.width)]
+        self.layers.append((COLUMNS, columns, None, colour))
+
+    def AddLines(self, lines, colour, halfWidth=0):
+        """lines is an array of (x1, y1, x2, y2) rows. A line with a halfWidth is drawn as a disc moved along it"""
+        lines = numpy.asarray(lines, dtype=float).reshape(-1, 4)
+        # The lines that don't cross the framebuffer aren't sampled
+        x1, y1, x2, y2 = lines.T
+        margin = halfWidth + 1
+        visible = ((numpy.maximum(x1, x2) >= -margin) & (numpy.minimum(x1, x2) < self.width + margin) &
+                   (numpy.maximum(y1, y2) >= -margin) & (numpy.minimum(y1, y2) < self.height + margin))
+        x1, y1, x2, y2 = lines[visible].T
+
+        # One sample per pixel along the longest axis of every line
+        counts = numpy.rint(numpy.maximum(numpy.abs(x2 - x1), numpy.abs(y2 - y1))).astype(int) + 1
+        index = numpy.repeat(numpy.arange(len(counts)), counts)
+        step = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        t = step / numpy.maximum(counts - 1, 1)[index]
+        xs = x1[index] + (x2 - x1)[index] * t
+        ys = y1[index] + (y2 - y1)[index] * t
+
+        if halfWidth > 0:
+            self.AddDiscs(numpy.column_stack((xs, ys, numpy.full(len(xs), halfWidth))), colour)
+        else:
+            self.AddPoints(xs, ys, colour)
+
+    def AddDiscs(self, discs, colour):
+        """discs is an array of (x, y, radius) rows"""
+        discs = numpy.asarray(discs, dtype=float).reshape(-1, 3)
+        radii = numpy.rint(discs[:, 2]).astype(int)
+        # The discs with the same radius are stamped together
+        for radius in numpy.unique(radii):
+            centres = discs[radii == radius]
+            dx, dy = self.GetDiscOffsets(radius)
+            xs = numpy.rint(centres[:, 0])[:, None] + dx[None, :]
+            ys = numpy.rint(centres[:, 1])[:, None] + dy[None, :]
+            self.AddPoints(xs.ravel(), ys.ravel(), colour)
+
+    def GetDiscOffsets(self, radius):
+        offsets = self.discOffsets.get(radius)
+        if offsets == None:
+            dy, dx = numpy.mgrid[-radius:radius + 1, -radius:radius + 1]
+            inside = dx**2 + dy**2 <= radius * (radius + 1)
+            offsets = self.discOffsets[radius] = (dx[inside], dy[inside])
+        return offsets
+
+    def AddPoints(self, xs, ys, colour):
+        xs = numpy.rint(xs).astype(int)
+        ys = numpy.rint(ys).astype(int)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        self.layers.append((POINTS, xs[inside], ys[inside], colour))
+
+    def Render(self):
+        """Clears the pixels and writes the layers added since the last Render()"""
+        tileHeight = -(-self.height // self.threads)
+        tiles = [(top, min(top + tileHeight, self.height)) for top in range(0, self.height, max(tileHeight, 1))]
+        if self.pool != None and len(tiles) > 1:
+            self.pool.map(self.RenderTile, tiles)
+        else:
+            for tile in tiles:
+                self.RenderTile(tile)
+        self.layers = []
+
+    def RenderTile(self, tile):
+        top, bottom = tile
+        pixels = self.pixels[top:bottom]
+        pixels[:] = self.background
+        for kind, a, b, colour in self.layers:
+            if kind == ROWS:
+                rows = a[(a >= top) & (a < bottom)]
+                pixels[rows - top] = colour
+            elif kind == COLUMNS:
+                pixels[:, a] = colour
+            else:
+                inside = (b >= top) & (b < bottom)
+                pixels[b[inside] - top, a[inside]] = colour
@@ -0,0 +1,142 @@
+"""
+    Drawing all the pendulums with a few calls. The rods, the pivots and the bobs of every pendulum are gathered
+    in arrays by Gather(), then drawn either on a DC with DrawLineList(), DrawEllipseList() and DrawPolygonList(),
+    one call for every style, or into a raster.Framebuffer.
+    It looks the same as Pendulum.Draw(), except that the pendulums are drawn in layers (all the halos, then all the rods...)
+    The pendulums outside the viewport are skipped, and below DETAIL_SCALE only the rods are drawn
+"""
+from __future__ import division
+import numpy
+import wx
+
+class PendulumRenderer(object):
+    HALO_COLOUR = (186, 170, 221)
+    ROD_COLOUR = (0, 0, 0)
+    BOB_COLOUR = (68, 68, 68)
+    # Below this zoom the bobs and the halos are only a few pixels wide, so the pendulums are drawn as polylines
+    DETAIL_SCALE = 0.5
+
+    def __init__(self):
+        # The pens and the brushes are created once for every colour
+        self.pens = {}
+        self.brushes = {}
+
+    def GetPen(self, colour):
+        pen = self.pens.get(colour)
+        if pen == None:
+            pen = self.pens[colour] = wx.Pen(wx.Colour(*colour))
+        return pen
+
+    def GetBrush(self, colour):
+        brush = self.brushes.get(colour)
+        if brush == None:
+            brush = self.brushes[colour] = wx.Brush(wx.Colour(*colour))
+        return brush
+
+    def Gather(self, pendulums, viewport=None, scale=1):
+        """Returns a dict with the shapes of the pendulums, in world coordinates:
+            'haloCircles', 'pivots' and 'bobs' are arrays of (x, y, radius) rows,
+            'haloLines' is an array of (x1, y1, x2, y2, halfWidth) rows and 'rods' of (x1, y1, x2, y2) rows.
+            viewport is the (left, top, right, bottom) of the visible world, None if everything is visible"""
+        detail = scale >= self.DETAIL_SCALE
+        rods = [numpy.empty((0, 4))]
+        pivots = [numpy.empty((0, 3))]
+        bobs = [numpy.empty((0, 3))]
+        haloCircles = [numpy.empty((0, 3))]
+        haloLines = [numpy.empty((0, 5))]
+
+        for pendulum in pendulums:
+            if viewport != None and not self.IsVisible(pendulum, viewport):
+                continue
+
+            snapshot = pendulum.GetDrawSnapshot()
+            radius = pendulum.radius
+            x = snapshot.x
+            y = snapshot.y
+
+            if snapshot.bobCount == 0:
+                # Without its pivot, a pendulum without bobs wouldn't be seen at all
+                pivots.append(numpy.array([[x, y, radius - 3]]))
+                if detail and pendulum.IsSelected():
+                    haloCircles.append(numpy.array([[x, y, radius]]))
+                continue
+
+            geometry = snapshot.GetGeometry()
+            xs = numpy.concatenate(([x], geometry.x * snapshot.scale + x))
+            ys = numpy.concatenate(([y], geometry.y * snapshot.scale + y))
+
+            rods.append(numpy.column_stack((xs[:-1], ys[:-1], xs[1:], ys[1:])))
+            if not detail:
+                continue
+            pivots.append(numpy.array([[x, y, radius - 3]]))
+            bobs.append(numpy.column_stack((xs[1:], ys[1:], numpy.full(snapshot.bobCount, radius))))
+
+            if pendulum.IsSelected():
+                # The halo is bigger around the bobs than around the pivot, and so is the first rod
+                haloRadius = numpy.full(snapshot.bobCount + 1, radius + 4)
+                haloRadius[0] = radius
+                haloCircles.append(numpy.column_stack((xs, ys, haloRadius)))
+                halfWidth = numpy.full(snapshot.bobCount, 3)
+                halfWidth[0] = 2
+                haloLines.append(numpy.column_stack((xs[:-1], ys[:-1], xs[1:], ys[1:], halfWidth)))
+
+        return {'rods': numpy.concatenate(rods),
+                'pivots': numpy.concatenate(pivots),
+                'bobs': numpy.concatenate(bobs),
+                'haloCircles': numpy.concatenate(haloCircles),
+                'haloLines': numpy.concatenate(haloLines)}
+
+    def IsVisible(self, pendulum, viewport):
+        x, y, r = pendulum.GetBoundingCircle()
+        left, top, right, bottom = viewport
+        return x + r >= left and x - r <= right and y + r >= top and y - r <= bottom
+
+    def Draw(self, dc, pendulums, viewport=None, scale=1):
+        shapes = self.Gather(pendulums, viewport, scale)
+
+        self.DrawCircles(dc, shapes['haloCircles'], self.HALO_COLOUR)
+        if len(shapes['haloLines']):
+            polygons = [self.GetRect(*line) for line in shapes['haloLines'].tolist()]
+            polygons = numpy.rint(polygons).astype(int).tolist()
+            dc.DrawPolygonList(polygons, self.GetPen(self.HALO_COLOUR), self.GetBrush(self.HALO_COLOUR))
+        if len(shapes['rods']):
+            lines = numpy.rint(shapes['rods']).astype(int).tolist()
+            dc.DrawLineList(lines, self.GetPen(self.ROD_COLOUR))
+        self.DrawCircles(dc, shapes['pivots'], self.ROD_COLOUR)
+        self.DrawCircles(dc, shapes['bobs'], self.BOB_COLOUR)
+
+    def DrawCircles(self, dc, circles, colour):
+        """circles is an array of (x, y, radius) rows"""
+        if not len(circles):
+            return
+        x, y, r = circles[:, 0], circles[:, 1], circles[:, 2]
+        ellipses = numpy.rint(numpy.column_stack((x - r, y - r, 2 * r, 2 * r))).astype(int).tolist()
+        dc.DrawEllipseList(ellipses, self.GetPen(colour), self.GetBrush(colour))
+
+    def GetRect(self, x1, y1, x2, y2, halfWidth):
+        """The corners of the rectangle of the given half width around a line"""
+        length = numpy.hypot(x2 - x1, y2 - y1)
+        if length == 0:
+            return [(x1, y1)] * 4
+        dx = (y2 - y1) / length * halfWidth
+        dy = (x1 - x2) / length * halfWidth
+        return [(x1 - dx, y1 - dy), (x2 - dx, y2 - dy), (x2 + dx, y2 + dy), (x1 + dx, y1 + dy)]
+
+    def Rasterise(self, framebuffer, pendulums, originX=0, originY=0, scale=1):
+        """Adds the pendulums to a raster.Framebuffer; the world point (0, 0) is at the pixel (originX, originY)"""
+        viewport = (-originX / scale, -originY / scale,
+                    (framebuffer.width - originX) / scale, (framebuffer.height - originY) / scale)
+        shapes = self.Gather(pendulums, viewport, scale)
+        origin = numpy.array([originX, originY])
+
+        def Circles(circles):
+            return numpy.column_stack((circles[:, :2] * scale + origin, circles[:, 2] * scale))
+
+        haloLines = shapes['haloLines']
+        for halfWidth in numpy.unique(haloLines[:, 4]):
+            lines = haloLines[haloLines[:, 4] == halfWidth, :4] * scale + numpy.tile(origin, 2)
+            framebuffer.AddLines(lines, self.HALO_COLOUR, int(round(halfWidth * scale)))
+        framebuffer.AddDiscs(Circles(shapes['haloCircles']), self.HALO_COLOUR)
+        framebuffer.AddLines(shapes['rods'] * scale + numpy.tile(origin, 2), self.ROD_COLOUR)
+        framebuffer.AddDiscs(Circles(shapes['pivots']), self.ROD_COLOUR)
+        framebuffer.AddDiscs(Circles(shapes['bobs']), self.BOB_COLOUR)
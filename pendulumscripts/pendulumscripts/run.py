@@ -0,0 +1,137 @@
+"""
+    Runs a scene without any GUI, as fast as possible, and streams the sampled states to disk:
+        python -m pendulumscripts.run scene.json --steps 1e6 --stride 100 --out traj.npz
+    The output has the arrays:
+        time        - (samples, pendulums) the simulated time of every pendulum at every sample
+                      (the pendulums of a scene can have different time intervals)
+        angles      - (samples, bobs) the angles of all the bobs, pendulum after pendulum
+        velocities  - (samples, bobs)
+        bobCounts   - (pendulums,) how many columns belong to every pendulum
+        pivots      - (pendulums, 2)
+"""
+from __future__ import division
+import os
+import sys
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+import numpy
+from numpy.lib.format import open_memmap
+from scene import LoadScene
+
+class TrajectoryWriter():
+    """Writes the samples to .npy files as they are produced, so the memory use doesn't depend on the run length.
+        For a .npz output, the .npy files are written in a temporary directory and stored in the archive at the end
+    """
+    ARRAYS = ('time', 'angles', 'velocities')
+
+    def __init__(self, path, sampleCount, pendulums):
+        self.path = path
+        self.sampleCount = sampleCount
+        self.sample = 0
+        self.compressed = path.endswith('.npz')
+
+        if self.compressed:
+            self.directory = tempfile.mkdtemp(prefix='trajectory', dir=os.path.dirname(os.path.abspath(path)))
+        else:
+            self.directory = path
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+        bobCount = sum(pendulum.bobCount for pendulum in pendulums)
+        self.arrays = {
+            'time': self.Create('time', (sampleCount, len(pendulums))),
+            'angles': self.Create('angles', (sampleCount, bobCount)),
+            'velocities': self.Create('velocities', (sampleCount, bobCount))}
+
+        numpy.save(os.path.join(self.directory, 'bobCounts.npy'), numpy.array([pendulum.bobCount for pendulum in pendulums]))
+        numpy.save(os.path.join(self.directory, 'pivots.npy'), numpy.array([(pendulum.x, pendulum.y) for pendulum in pendulums], dtype=numpy.float64).reshape(-1, 2))
+
+    def Create(self, name, shape):
+        return open_memmap(os.path.join(self.directory, name + '.npy'), mode='w+', dtype=numpy.float64, shape=shape)
+
+    def Write(self, pendulums):
+        k = self.sample
+        column = 0
+        for i, pendulum in enumerate(pendulums):
+            self.arrays['time'][k, i] = pendulum.time
+            n = pendulum.bobCount
+            self.arrays['angles'][k, column:column + n] = pendulum.angles
+            self.arrays['velocities'][k, column:column + n] = pendulum.vels
+            column += n
+        self.sample += 1
+
+    def Flush(self):
+        for array in self.arrays.values():
+            array.flush()
+
+    def Close(self):
+        self.Flush()
+        self.arrays = {}
+        if not self.compressed:
+            return
+
+        archive = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        for name in self.ARRAYS + ('bobCounts', 'pivots'):
+            archive.write(os.path.join(self.directory, name + '.npy'), name + '.npy')
+        archive.close()
+        shutil.rmtree(self.directory)
+
+def Run(pendulums, steps, stride=1, writer=None, reportInterval=5.):
+    """Advances every pendulum 'steps' times (each by its own time interval) and gives every 'stride'-th state to the writer.
+        Returns the number of steps per second
+    """
+    if writer != None:
+        writer.Write(pendulums)
+
+    start = time.time()
+    lastReport = start
+    # xrange, so a long run doesn't build a list of all the steps
+    for step in xrange(1, steps + 1):
+        for pendulum in pendulums:
+            pendulum.UpdateData()
+
+        if writer != None and step % stride == 0:
+            writer.Write(pendulums)
+
+        if step % 1000 == 0 and time.time() - lastReport >= reportInterval:
+            lastReport = time.time()
+            if writer != None:
+                writer.Flush()
+            sys.stderr.write('%d/%d steps, %.0f steps/s\n' % (step, steps, step / (lastReport - start)))
+
+    elapsed = time.time() - start
+    if elapsed == 0:
+        return float('inf')
+    return steps / elapsed
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs a pendulum scene without the GUI')
+    parser.add_argument('scene', help='the scene JSON file')
+    parser.add_argument('--steps', type=float, default=1e4, help='how many time intervals to simulate')
+    parser.add_argument('--stride', type=int, default=1, help='write every stride-th state')
+    parser.add_argument('--out', default=None, help='the output .npz file (or a directory for .npy files)')
+    args = parser.parse_args(args)
+
+    pendulums = LoadScene(args.scene)
+    steps = int(args.steps)
+    stride = max(1, args.stride)
+
+    writer = None
+    if args.out != None:
+        writer = TrajectoryWriter(args.out, steps // stride + 1, pendulums)
+
+    stepsPerSecond = Run(pendulums, steps, stride, writer)
+
+    if writer != None:
+        writer.Close()
+
+    print 'Pendulums: ' + str(len(pendulums))
+    print 'Steps: ' + str(steps)
+    print 'Steps/s: ' + str(stepsPerSecond)
+    print 'Pendulum steps/s: ' + str(stepsPerSecond * len(pendulums))
+
+if __name__ == '__main__':
+    main()
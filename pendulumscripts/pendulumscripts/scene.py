@@ -0,0 +1,84 @@
+"""
+    Reading and writing scenes. A scene is a JSON file like:
+        {
+            "timeInterval": 0.002,
+            "friction": 0,
+            "pendulums": [
+                {"x": 0, "y": 0, "solver": "recursive", "integrator": "rk4",
+                 "bobs": [{"m": 10, "l": 100, "a": 1.5, "v": 0}, {"m": 10, "l": 100, "a": 3, "v": 0}]}
+            ]
+        }
+    Only "pendulums" is required. A pendulum can also have "g" (the gravity) and "scale" (the pixels per length unit).
+    The bob keys are the same as in PendulumHandler (m - mass, l - length, a - angle, v - velocity)
+"""
+import json
+from physics import PendulumBase
+
+DEFAULT_TIME_INTERVAL = 1. / 500
+DEFAULT_BOB = {'m':10, 'l':100, 'a':0, 'v':0}
+
+def SceneFromDict(scene, pendulumClass=PendulumBase):
+    """Creates the pendulums described by the scene dictionary"""
+    timeInterval = scene.get('timeInterval', DEFAULT_TIME_INTERVAL)
+    friction = scene.get('friction')
+
+    pendulums = []
+    for description in scene['pendulums']:
+        pendulum = pendulumClass(description.get('x', 0), description.get('y', 0), description.get('timeInterval', timeInterval))
+        if friction != None:
+            pendulum.frictionCoefficient = friction
+        if 'solver' in description:
+            pendulum.SetSolver(description['solver'])
+        if 'integrator' in description:
+            pendulum.SetIntegrator(description['integrator'])
+        if 'g' in description:
+            pendulum.g = description['g']
+        # The lengths of the bobs are divided by the scale, so it's set before adding them
+        if 'scale' in description:
+            pendulum.scale = description['scale']
+
+        bobs = description.get('bobs', [])
+        pendulum.Reserve(len(bobs))
+        for bobId, bob in enumerate(bobs, 1):
+            values = dict(DEFAULT_BOB)
+            values.update(bob)
+            pendulum.AddBob(bobId, values['m'], values['l'], values['a'], values['v'])
+        pendulums.append(pendulum)
+
+    return pendulums
+
+def SceneToDict(pendulums, timeInterval=None, friction=None):
+    """The inverse of SceneFromDict()"""
+    scene = {'pendulums': []}
+    if timeInterval != None:
+        scene['timeInterval'] = timeInterval
+    if friction != None:
+        scene['friction'] = friction
+
+    for pendulum in pendulums:
+        bobs = []
+        for i in range(0, pendulum.bobCount):
+            bobs.append({
+                'm': float(pendulum.m[i]),
+                'l': float(pendulum.l[i] * pendulum.scale),
+                'a': float(pendulum.angles[i]),
+                'v': float(pendulum.vels[i])})
+        scene['pendulums'].append({
+            'x': pendulum.x,
+            'y': pendulum.y,
+            'timeInterval': pendulum.timeInterval,
+            'solver': pendulum.GetSolver(),
+            'integrator': pendulum.GetIntegrator().name,
+            'g': float(pendulum.g),
+            'scale': pendulum.scale,
+            'bobs': bobs})
+
+    return scene
+
+def LoadScene(path, pendulumClass=PendulumBase):
+    with open(path) as f:
+        return SceneFromDict(json.load(f), pendulumClass)
+
+def SaveScene(path, pendulums, timeInterval=None, friction=None):
+    with open(path, 'w') as f:
+        json.dump(SceneToDict(pendulums, timeInterval, friction), f, indent=4)
@@ -0,0 +1,212 @@
+import sys
+import time
+import heapq
+import itertools
+import threading
+from collections import deque, OrderedDict
+
+# time.clock() is the precise wall clock on Windows, but it measures the processor time on the other platforms
+if sys.platform == 'win32':
+    clock = time.clock
+else:
+    clock = time.time
+
+class FixedStepScheduler(object):
+    """Calls tick() 'ticksPerSecond' times per second from the thread that executes Run().
+        Between the ticks the thread sleeps until the next deadline; if it wakes up late, all the due ticks are run
+        in one batch (at most maxTicksPerBatch, the rest are dropped). While paused, the thread waits without using the processor
+        The lock is held while a batch of ticks runs, so another thread can hold it to work on the ticked objects
+    """
+    def __init__(self, ticksPerSecond, tick, maxTicksPerBatch=50, paused=True):
+        self.tickInterval = 1. / ticksPerSecond
+        self.tick = tick
+        self.maxTicksPerBatch = maxTicksPerBatch
+
+        self.running = False
+        self.lock = threading.Lock()
+        # The event is set while the scheduler is not paused
+        self.resumed = threading.Event()
+        if not paused:
+            self.resumed.set()
+
+        self.ticks = 0
+        self.droppedTicks = 0
+
+        # The time spent in tick() since the last call to GetCpuUsage()
+        self.busyTime = 0
+        self.measureStart = clock()
+
+    def Run(self):
+        self.running = True
+        lastTime = clock()
+
+        while self.running:
+            if not self.resumed.is_set():
+                self.resumed.wait(0.1)
+                # The time spent paused doesn't have to be caught up
+                lastTime = clock()
+                continue
+
+            currentTime = clock()
+            due = int((currentTime - lastTime) / self.tickInterval)
+            if due == 0:
+                time.sleep(lastTime + self.tickInterval - currentTime)
+                continue
+
+            if due > self.maxTicksPerBatch:
+                self.droppedTicks += due - self.maxTicksPerBatch
+                lastTime += (due - self.maxTicksPerBatch) * self.tickInterval
+                due = self.maxTicksPerBatch
+
+            with self.lock:
+                for i in range(0, due):
+                    self.tick()
+                    lastTime += self.tickInterval
+            self.ticks += due
+            self.busyTime += clock() - currentTime
+
+    def Stop(self):
+        self.running = False
+        # Wake up the thread if it waits
+        self.resumed.set()
+
+    def SetPaused(self, paused):
+        if paused:
+            self.resumed.clear()
+        else:
+            self.resumed.set()
+
+    def IsPaused(self):
+        return not self.resumed.is_set()
+
+    def GetCpuUsage(self):
+        """Returns the fraction of the time (0..1) the scheduler thread was busy since the last call"""
+        currentTime = clock()
+        elapsed = currentTime - self.measureStart
+        usage = 0
+        if elapsed > 0:
+            usage = min(1., self.busyTime / elapsed)
+        self.busyTime = 0
+        self.measureStart = currentTime
+        return usage
+
+class UpdateScheduler(object):
+    """Updates many Updatable objects from one place.
+        The objects with an updateInterval are kept in a heap ordered by the time of their next update,
+        so a Tick() reads the clock once and only touches the objects that are due.
+        The objects with ticksPerUpdate are grouped by it and a group is updated every ticksPerUpdate ticks.
+        Add() and Remove() can be called from another thread: the changes are applied at the start of the next Tick()
+    """
+    def __init__(self):
+        self.heap = []
+        # The sequence number of the heap entry that is valid for every timed object; the other entries are skipped
+        self.entries = {}
+        self.sequence = itertools.count()
+        self.groups = {}
+        self.tickCount = 0
+        self.changes = deque()
+
+    def Add(self, updatable):
+        self.changes.append((True, updatable))
+
+    def Remove(self, updatable):
+        self.changes.append((False, updatable))
+
+    def Reschedule(self, updatable):
+        """Must be called after the updateInterval or the ticksPerUpdate of a registered object is changed"""
+        self.changes.append((False, updatable))
+        self.changes.append((True, updatable))
+
+    def ApplyChanges(self, currentTime):
+        while self.changes:
+            add, updatable = self.changes.popleft()
+            self.Discard(updatable)
+            if not add:
+                continue
+            if updatable.ticksPerUpdate != None:
+                self.groups.setdefault(updatable.ticksPerUpdate, []).append(updatable)
+            else:
+                self.Push(updatable, currentTime)
+
+    def Discard(self, updatable):
+        if updatable in self.entries:
+            # The heap entry becomes invalid and is dropped when it reaches the top
+            del self.entries[updatable]
+            return
+        for ticksPerUpdate, group in self.groups.items():
+            if updatable in group:
+                group.remove(updatable)
+                if not group:
+                    del self.groups[ticksPerUpdate]
+                return
+
+    def Push(self, updatable, currentTime):
+        dueTime = updatable.NextUpdateTime()
+        if dueTime == None or updatable.pause:
+            # Paused objects are checked again after one interval
+            dueTime = currentTime + updatable.updateInterval
+        sequence = next(self.sequence)
+        self.entries[updatable] = sequence
+        heapq.heappush(self.heap, (dueTime, sequence, updatable))
+
+    def Tick(self, currentTime=None):
+        if currentTime == None:
+            currentTime = clock()
+        self.ApplyChanges(currentTime)
+
+        self.tickCount += 1
+        for ticksPerUpdate, group in self.groups.items():
+            if self.tickCount % ticksPerUpdate == 0:
+                for updatable in group:
+                    if not updatable.pause:
+                        updatable.UpdateData()
+
+        # Take all the due objects off the heap first, then update them as a batch
+        due = []
+        while self.heap and self.heap[0][0] <= currentTime:
+            dueTime, sequence, updatable = heapq.heappop(self.heap)
+            if self.entries.get(updatable) == sequence:
+                due.append(updatable)
+
+        for updatable in due:
+            if not updatable.pause:
+                updatable.Advance(currentTime)
+            self.Push(updatable, currentTime)
+
+    def GetCount(self):
+        return len(self.entries) + sum(len(group) for group in self.groups.values())
+
+
+
+class CommandQueue(object):
+    """Changes to the simulated objects, posted from any thread and applied by the simulation thread between two ticks.
+        A command is a function with its arguments. Commands posted with the same key replace each other,
+        so a series of edits to the same field (e.g. dragging a pivot) is applied only once, with the last value.
+        Apply() runs all the posted commands in one batch, in the order they were (last) posted
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = OrderedDict()
+        self.sequence = itertools.count()
+
+    def Post(self, function, args=(), key=None):
+        if key == None:
+            # Every command without a key is kept
+            key = next(self.sequence)
+        with self.lock:
+            self.commands.pop(key, None)
+            self.commands[key] = (function, args)
+
+    def Apply(self):
+        """Runs the posted commands; it must be called from the thread that updates the objects"""
+        if not self.commands:
+            return 0
+        with self.lock:
+            commands = self.commands
+            self.commands = OrderedDict()
+        for function, args in commands.values():
+            function(*args)
+        return len(commands)
+
+    def __len__(self):
+        return len(self.commands)
@@ -0,0 +1,170 @@
+"""
+    Parameter sweeps: the same pendulum is run over a grid of initial conditions and physical parameters.
+        from sweep import Sweep, MaxEnergyError
+        results = Sweep(pendulum, [('a0', numpy.linspace(-3, 3, 100)), ('a1', numpy.linspace(-3, 3, 100))],
+                        MaxEnergyError(), steps=5000, processes=8)
+    results has the shape (100, 100). The runs are split in chunks that are given to a pool of processes,
+    and every chunk is advanced as one PendulumEnsemble (dense solver, semi-implicit Euler)
+"""
+from __future__ import division
+import sys
+import itertools
+import multiprocessing
+import numpy
+from numpy import float64
+from physics import PendulumEnsemble
+from scene import SceneToDict, SceneFromDict
+
+# The first letter of a grid parameter name is the bob variable, the rest is the bob index (e.g. 'a0', 'm2')
+# 'g' is the gravity of the whole pendulum
+PARAMETERS = {'a': 'angles', 'v': 'vels', 'm': 'm', 'l': 'l'}
+
+class Reduction(object):
+    """Reduces the trajectory of every run of a chunk to a result. The functions get the PendulumEnsemble of the chunk"""
+    def Start(self, ensemble):
+        pass
+
+    def Update(self, ensemble):
+        """Called after every step"""
+        pass
+
+    def Result(self, ensemble):
+        """Returns an array with one row for every member of the ensemble"""
+        raise NotImplementedError
+
+class FinalState(Reduction):
+    """The angles and the velocities at the end of the run - shape (2, bobCount) for every run"""
+    def Result(self, ensemble):
+        return numpy.stack((ensemble.angles, ensemble.vels), axis=1)
+
+class MaxEnergyError(Reduction):
+    """The largest absolute difference between the total energy and the initial total energy"""
+    def Start(self, ensemble):
+        self.initial = ensemble.PotentialEnergy() + ensemble.KineticEnergy()
+        self.error = numpy.zeros(ensemble.count, dtype=float64)
+
+    def Update(self, ensemble):
+        energy = ensemble.PotentialEnergy() + ensemble.KineticEnergy()
+        numpy.maximum(self.error, numpy.abs(energy - self.initial), out=self.error)
+
+    def Result(self, ensemble):
+        return self.error
+
+class FirstFlipTime(Reduction):
+    """The simulated time when any bob first goes over its pivot (|angle| > pi), nan if it never flips"""
+    def Start(self, ensemble):
+        self.start = ensemble.time
+        self.flipTime = numpy.full(ensemble.count, numpy.nan, dtype=float64)
+
+    def Update(self, ensemble):
+        flipped = (numpy.abs(ensemble.angles) > numpy.pi).any(axis=1) & numpy.isnan(self.flipTime)
+        self.flipTime[flipped] = ensemble.time - self.start
+
+    def Result(self, ensemble):
+        return self.flipTime
+
+def ParseParameter(name):
+    """'a0' -> ('angles', 0), 'g' -> ('g', None)"""
+    if name == 'g':
+        return 'g', None
+    assert(name[:1] in PARAMETERS and name[1:].isdigit()), "Unknown sweep parameter: " + str(name)
+    return PARAMETERS[name[0]], int(name[1:])
+
+def RunChunk(job):
+    """Runs the grid points [start, stop) as one ensemble. This is the function executed by the worker processes"""
+    description, names, values, start, stop, reduction, steps = job
+    pendulums = SceneFromDict(description)
+    ensemble = PendulumEnsemble.FromPendulums(pendulums * (stop - start))
+
+    shape = [len(v) for v in values]
+    indexes = numpy.unravel_index(numpy.arange(start, stop), shape)
+    g = None
+    for name, gridValues, index in zip(names, values, indexes):
+        variable, bob = ParseParameter(name)
+        column = numpy.asarray(gridValues, dtype=float64)[index]
+        if variable == 'g':
+            g = column
+        elif variable == 'l':
+            ensemble.l[:, bob] = column / ensemble.scale
+        else:
+            getattr(ensemble, variable)[:, bob] = column
+    if g is not None:
+        ensemble.g = g
+
+    reduction.Start(ensemble)
+    for i in xrange(0, steps):
+        ensemble.UpdateData()
+        reduction.Update(ensemble)
+
+    return start, reduction.Result(ensemble)
+
+def PrintProgress(done, total):
+    sys.stderr.write('\r%d/%d runs' % (done, total))
+    if done == total:
+        sys.stderr.write('\n')
+
+def Sweep(pendulum, grid, reduction, steps, processes=None, chunkSize=None, progress=None):
+    """Runs 'pendulum' for 'steps' time intervals at every point of the grid and returns the reduced results.
+        grid is a list of (name, values) pairs (or a dict, sorted by name), with names like 'a0', 'v1', 'm0', 'l2' or 'g'
+        The result has the shape (len(values1), len(values2), ...) + the shape of the reduction result of one run.
+        progress(done, total) is called when a chunk is done (PrintProgress writes it on stderr)
+    """
+    if isinstance(grid, dict):
+        grid = sorted(grid.items())
+    names = [name for name, values in grid]
+    values = [list(values) for name, values in grid]
+    for name in names:
+        ParseParameter(name)
+
+    shape = tuple(len(v) for v in values)
+    total = int(numpy.prod(shape))
+    if processes == None:
+        processes = multiprocessing.cpu_count()
+    if chunkSize == None:
+        # A few chunks per process keep all of them busy until the end
+        chunkSize = max(1, min(1024, -(-total // (4 * processes))))
+
+    # The description holds the gravity and the scale of the pendulum too, the workers rebuild it from there
+    description = SceneToDict([pendulum], friction=pendulum.frictionCoefficient)
+    if total == 0:
+        return numpy.empty(shape)
+    jobs = [(description, names, values, start, min(total, start + chunkSize), reduction, steps)
+            for start in range(0, total, chunkSize)]
+
+    if processes == 1:
+        chunks = itertools.imap(RunChunk, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        chunks = pool.imap_unordered(RunChunk, jobs)
+
+    results = None
+    done = 0
+    try:
+        for start, result in chunks:
+            if results is None:
+                results = numpy.empty((total,) + result.shape[1:], dtype=result.dtype)
+            results[start:start + len(result)] = result
+            done += len(result)
+            if progress != None:
+                progress(done, total)
+    finally:
+        if pool != None:
+            pool.close()
+            pool.join()
+
+    return results.reshape(shape + results.shape[1:])
+
+if __name__ == '__main__':
+    import time
+    from physics import PendulumBase
+
+    pendulum = PendulumBase(0, 0, 0.002)
+    pendulum.AddBob(1)
+    pendulum.AddBob(2)
+    angles = numpy.linspace(-3, 3, 40)
+    for processes in (1, multiprocessing.cpu_count()):
+        t = time.time()
+        flips = Sweep(pendulum, [('a0', angles), ('a1', angles)], FirstFlipTime(), 2000, processes=processes)
+        print 'Processes: ' + str(processes) + ' time: ' + str(time.time() - t)
+    print 'Runs that flipped: ' + str(numpy.isfinite(flips).sum()) + '/' + str(flips.size)
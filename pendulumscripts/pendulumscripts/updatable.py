@@ -1,9 +1,18 @@
-import time
+from scheduler import clock
 
 class Updatable(object):
     """This class handles an object that can be updated repeatedly within a given time interval(updateInterval)
-        or can be updated after a given tick count (ticksPerUpdate)"""
-    def __init__(self, ticksPerUpdate=None, updateInterval=None):
+        or can be updated after a given tick count (ticksPerUpdate)
+        If the updates can't keep up with the clock, at most maxSubsteps updates are done in one call
+        and the rest of the time is handled by overloadPolicy:
+            OVERLOAD_DILATE - the object runs in slow motion; a lag of at most maxSubsteps updates is kept and caught up later
+            OVERLOAD_DROP - the lag is dropped and the object continues from the current time
+        The skipped time is added to dilatedTime or droppedTime
+        timeScale makes the updates run faster or slower than the clock: the updates due in one call are done by UpdateSteps()"""
+    OVERLOAD_DILATE = 'dilate'
+    OVERLOAD_DROP = 'drop'
+
+    def __init__(self, ticksPerUpdate=None, updateInterval=None, maxSubsteps=10, overloadPolicy=OVERLOAD_DILATE):
         assert(ticksPerUpdate != None or updateInterval != None), "__init__() function of LiveObject needs one keyword argument" 
 
         self.__ticksPerUpdate = ticksPerUpdate
@@ -11,6 +20,12 @@ class Updatable(object):
 
         self.__updateInterval = updateInterval
         self.lastUpdated = None
+        self.__timeScale = 1
+
+        self.maxSubsteps = maxSubsteps
+        self.overloadPolicy = overloadPolicy
+        self.droppedTime = 0
+        self.dilatedTime = 0
 
         self.__pause = False
 
@@ -18,6 +33,11 @@ class Updatable(object):
         """This function is be implemented by subclasses"""
         pass
 
+    def UpdateSteps(self, steps):
+        """Does 'steps' updates at once. Subclasses can override it with a faster loop"""
+        for i in range(steps):
+            self.UpdateData()
+
     def Tick(self):
         if self.__pause:
             return
@@ -29,13 +49,55 @@ class Updatable(object):
                 self.ticks = 0
                 self.UpdateData()
         else:
-            if self.lastUpdated == None:
-                self.lastUpdated = time.clock()
+            self.Advance(clock())
 
-            currentTime = time.clock()
-            while currentTime - self.lastUpdated >= self.__updateInterval:
-                self.lastUpdated += self.__updateInterval
-                self.UpdateData()
+    def Advance(self, currentTime):
+        """Runs all the updates that are due at currentTime (for objects with an updateInterval)"""
+        if self.lastUpdated == None:
+            self.lastUpdated = currentTime
+
+        interval = self.__updateInterval / self.__timeScale
+        steps = int((currentTime - self.lastUpdated) / interval)
+        maxSteps = self.GetMaxSteps()
+        if maxSteps != None and steps > maxSteps:
+            steps = maxSteps
+        if steps > 0:
+            self.lastUpdated += steps * interval
+            self.UpdateSteps(steps)
+
+        if currentTime - self.lastUpdated >= interval:
+            self.Overload(currentTime)
+
+    def GetMaxSteps(self):
+        """The most updates done in one call; maxSubsteps is for a timeScale of 1"""
+        if self.maxSubsteps == None:
+            return None
+        return int(self.maxSubsteps * max(1, self.__timeScale))
+
+    def Overload(self, currentTime):
+        """Called when the updates are behind currentTime after the maximum number of updates"""
+        lag = currentTime - self.lastUpdated
+        if self.overloadPolicy == self.OVERLOAD_DROP:
+            self.lastUpdated = currentTime
+            self.droppedTime += lag
+        else:
+            maxLag = self.GetMaxSteps() * self.__updateInterval / self.__timeScale
+            if lag > maxLag:
+                self.lastUpdated = currentTime - maxLag
+                self.dilatedTime += lag - maxLag
+
+    def IsOverloaded(self):
+        return self.droppedTime > 0 or self.dilatedTime > 0
+
+    def ResetOverload(self):
+        self.droppedTime = 0
+        self.dilatedTime = 0
+
+    def NextUpdateTime(self):
+        """The time when the next update is due, or None if it wasn't updated yet"""
+        if self.lastUpdated == None:
+            return None
+        return self.lastUpdated + self.__updateInterval / self.__timeScale
 
     @property
     def ticksPerUpdate(self):
@@ -54,6 +116,24 @@ class Updatable(object):
         if updateInterval > 0.001 and updateInterval < 1:
             self.__updateInterval = updateInterval
 
+    @property
+    def timeScale(self):
+        return self.__timeScale
+
+    @timeScale.setter
+    def timeScale(self, timeScale):
+        assert(timeScale > 0), "timeScale must be positive"
+        self.__timeScale = timeScale
+
+    @property
+    def overloadPolicy(self):
+        return self.__overloadPolicy
+
+    @overloadPolicy.setter
+    def overloadPolicy(self, overloadPolicy):
+        assert(overloadPolicy in (self.OVERLOAD_DILATE, self.OVERLOAD_DROP)), "Unknown overload policy: " + str(overloadPolicy)
+        self.__overloadPolicy = overloadPolicy
+
     @property
     def pause(self):
         return self.__pause
@@ -62,5 +142,5 @@ class Updatable(object):
     def pause(self, pause):
         assert(isinstance(pause, bool)), "pause must be bool"
         if not pause and self.__updateInterval != None:
-            self.lastUpdated = time.clock()
+            self.lastUpdated = clock()
         self.__pause = pause
\ No newline at end of file